@@ -0,0 +1,54 @@
+"""
+Cost of many consecutive `set()` calls with per-call saves versus
+a single `Config.batch()`.
+
+    $ python benchmarks/bench_batch.py --keys 500
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+class CountingConfig(yact.Config):
+    writes = 0
+
+    def save(self):
+        self.writes += 1
+        super(CountingConfig, self).save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--keys', type=int, default=500)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='yact-bench-')
+    try:
+        path = os.path.join(tmpdir, 'bench.yaml')
+        for mode in ('autosave', 'batch'):
+            with open(path, 'w') as f:
+                f.write('service: {name: bench}\n')
+            config = CountingConfig(path)
+            config.refresh()
+            start = perf_counter()
+            if mode == 'batch':
+                with config.batch():
+                    for i in range(args.keys):
+                        config.set('provisioned.key{}'.format(i), i)
+            else:
+                for i in range(args.keys):
+                    config.set('provisioned.key{}'.format(i), i)
+            elapsed = perf_counter() - start
+            print('{:<9} {} sets: {:8.1f} ms, {} disk writes'.format(mode, args.keys, elapsed * 1e3, config.writes))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Boot time of loading a conf.d style directory of fragment files:
+one `from_file` call per file versus `load_directory` with a thread
+pool and with a process pool.
+
+    $ python benchmarks/bench_boot.py --files 50 100 200
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def generate(directory, files, entries):
+    for i in range(files):
+        data = {'fragment{}'.format(i): {'entry{}'.format(e): {'value': e, 'name': 'n{}'.format(e)}
+                                         for e in range(entries)}}
+        with open(os.path.join(directory, '{:04d}.yaml'.format(i)), 'w') as f:
+            yaml.dump(data, f, default_flow_style=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--entries', type=int, default=100, help='entries per fragment')
+    args = parser.parse_args()
+
+    for files in args.files:
+        directory = tempfile.mkdtemp(prefix='yact-bench-')
+        try:
+            generate(directory, files, args.entries)
+            names = sorted(os.listdir(directory))
+            cases = [
+                ('from_file loop', lambda: [yact.from_file(n, directory) for n in names]),
+                ('threads', lambda: yact.load_directory(directory)),
+                ('processes', lambda: yact.load_directory(directory, processes=True)),
+            ]
+            for name, fn in cases:
+                start = perf_counter()
+                fn()
+                print('{:>4} files  {:<15} {:9.1f} ms'.format(files, name, (perf_counter() - start) * 1e3))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Bulk query costs: `get_many` against repeated `get`, and prefix and
+glob scans through the flattened key index against walking the tree.
+
+    $ python benchmarks/bench_bulk.py --services 100 1000 10000
+"""
+import os
+import sys
+import timeit
+import argparse
+from fnmatch import fnmatchcase
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def generate(services):
+    return {'services': {'svc{}'.format(i): {'host': 'svc{}.example.com'.format(i), 'port': 8000 + i % 1000,
+                                             'limits': {'cpu': i % 8, 'memory': 256}}
+                         for i in range(services)},
+            'db': {'primary': {'host': 'db1', 'port': 5432}, 'replica': {'host': 'db2', 'port': 5432}}}
+
+
+def walk(data, prefix):
+    """The hand-written alternative: visit every node below prefix"""
+    for name, value in data.items():
+        key = prefix + name
+        if isinstance(value, dict) and value:
+            for pair in walk(value, key + '.'):
+                yield pair
+        else:
+            yield key, value
+
+
+def walk_find(data, pattern):
+    return [(key, value) for key, value in walk(data, '')
+            if len(key.split('.')) == len(pattern.split('.')) and fnmatchcase(key, pattern)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--services', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--keys', type=int, default=30, help='keys fetched per get_many call')
+    parser.add_argument('--number', type=int, default=1000)
+    args = parser.parse_args()
+
+    for services in args.services:
+        config = yact.Config(None, autosave=False)
+        config._publish(generate(services))
+        data = config._data
+        keys = ['services.svc{}.host'.format(i * services // args.keys) for i in range(args.keys)]
+        config.find('db.*.host')  # Build the index outside the timings
+        cases = [
+            ('{} x get'.format(args.keys), lambda: [config.get(key) for key in keys]),
+            ('get_many', lambda: config.get_many(keys)),
+            ('walk db', lambda: list(walk(data['db'], 'db.'))),
+            ("items('db')", lambda: config.items('db')),
+            ("walk find 'db.*.host'", lambda: walk_find(data, 'db.*.host')),
+            ("find('db.*.host')", lambda: config.find('db.*.host')),
+        ]
+        print('{} services, {} indexed keys'.format(services, len(config._snapshot.index)))
+        for name, fn in cases:
+            per_call = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+            print('  {:<24} {:10.2f} us'.format(name, per_call * 1e6))
+        for name, derived in (('index rebuild', False), ('index update after set', True)):
+            config.set('services.svc0.port', services)
+            if not derived:
+                config._publish(config._data)  # Publishing whole new data drops the previous index
+            start = timeit.default_timer()
+            config.items('db')
+            print('  {:<24} {:10.2f} us'.format(name, (timeit.default_timer() - start) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
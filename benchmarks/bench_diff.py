@@ -0,0 +1,69 @@
+"""
+Cost of diffing two large config trees that differ in a single leaf.
+
+Compares `yact.diff.diff` against a naive walk that visits every leaf,
+for a freshly parsed tree (no shared subtrees) and for a snapshot
+produced by `Config.set` (untouched subtrees shared by identity).
+
+    $ python benchmarks/bench_diff.py --sections 200 --entries 200
+"""
+import os
+import sys
+import copy
+import argparse
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+from yact.diff import diff  # noqa: E402
+
+
+def naive_diff(old, new, path=()):
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = []
+        for key in set(old) | set(new):
+            if key not in old or key not in new:
+                changed.append(path + (key,))
+            else:
+                changed.extend(naive_diff(old[key], new[key], path + (key,)))
+        return changed
+    return [] if old == new else [path]
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = fn()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sections', type=int, default=200)
+    parser.add_argument('--entries', type=int, default=200)
+    args = parser.parse_args()
+
+    old = {'section{}'.format(s): {'entry{}'.format(e): {'value': e, 'enabled': True}
+                                   for e in range(args.entries)} for s in range(args.sections)}
+    print('{} leaves'.format(args.sections * args.entries * 2))
+
+    reparsed = copy.deepcopy(old)
+    reparsed['section7']['entry3']['value'] = -1
+    config = yact.Config(None, autosave=False)
+    config._publish(old)
+    config.set('section7.entry3.value', -1)
+    copied = config._data
+
+    for name, new in (('reparsed tree', reparsed), ('set() snapshot', copied)):
+        naive, expected = timed(lambda: naive_diff(old, new))
+        fast, result = timed(lambda: list(diff(old, new)))
+        assert result == expected, (result, expected)
+        print('{:<15} naive {:9.3f} ms   yact.diff {:9.3f} ms   {:8.1f}x'.format(
+            name, naive * 1e3, fast * 1e3, naive / fast))
+
+
+if __name__ == '__main__':
+    main()
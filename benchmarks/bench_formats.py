@@ -0,0 +1,110 @@
+"""
+Parse and dump time of every config format backend across generated
+config sizes. Backends whose optional dependency is missing are
+reported as unavailable.
+
+    $ python benchmarks/bench_formats.py --sizes 100 1000 10000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from yact.backends import YAMLBackend, JSONBackend, TOMLBackend, MsgpackBackend  # noqa: E402
+
+
+def generate(entries):
+    return {
+        'service': {'name': 'bench', 'debug': False},
+        'entries': {
+            'entry{}'.format(i): {
+                'host': 'host-{}.example.com'.format(i),
+                'port': 1024 + i,
+                'weight': i / 3.0,
+                'tags': ['a', 'b', 'c'],
+            } for i in range(entries)
+        },
+    }
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def encode(backend, data):
+    """
+    Serialized data, falling back to a reference encoder for backends
+    that can read but not write here
+    """
+    try:
+        return backend.dump(data), True
+    except ImportError:
+        if isinstance(backend, TOMLBackend):
+            return toml_reference(data).encode('utf-8'), False
+        raise
+
+
+def toml_reference(data, prefix=()):
+    """
+    Minimal TOML writer for the generated data (tables, scalars and string lists)
+    """
+    lines, tables = [], []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        elif isinstance(value, bool):
+            lines.append('{} = {}'.format(key, 'true' if value else 'false'))
+        elif isinstance(value, list):
+            lines.append('{} = [{}]'.format(key, ', '.join('"{}"'.format(v) for v in value)))
+        elif isinstance(value, str):
+            lines.append('{} = "{}"'.format(key, value))
+        else:
+            lines.append('{} = {!r}'.format(key, value))
+    out = []
+    if prefix and lines:
+        out.append('[{}]'.format('.'.join(prefix)))
+    out.extend(lines)
+    for key, value in tables:
+        out.append(toml_reference(value, prefix + (key,)))
+    return '\n'.join(out) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [
+        ('yaml-pure', YAMLBackend(use_libyaml=False)),
+        ('yaml', YAMLBackend()),
+        ('json', JSONBackend(use_orjson=False)),
+        ('orjson', JSONBackend()),
+        ('toml', TOMLBackend()),
+        ('msgpack', MsgpackBackend()),
+    ]
+    for size in args.sizes:
+        data = generate(size)
+        for name, backend in backends:
+            if name == 'orjson' and not backend.orjson:
+                print('{:>7} entries {:<10} unavailable (orjson not installed)'.format(size, name))
+                continue
+            try:
+                raw, dumps = encode(backend, data)
+                load = best(lambda: backend.load(raw), args.repeat)
+            except ImportError as e:
+                print('{:>7} entries {:<10} unavailable ({})'.format(size, name, e))
+                continue
+            dump = '{:9.2f} ms'.format(best(lambda: backend.dump(data), args.repeat) * 1e3) if dumps else '      n/a   '
+            print('{:>7} entries {:<10} {:>9.1f} KiB  load {:9.2f} ms  dump {}'.format(
+                size, name, len(raw) / 1024.0, load * 1e3, dump))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Memory used by a loaded config in the default (plain dicts and lists)
+and frozen layouts, measured with tracemalloc, plus lookup cost.
+
+    $ python benchmarks/bench_frozen.py --records 20000
+"""
+import os
+import sys
+import timeit
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+from yact.frozen import freeze  # noqa: E402
+
+
+def generate(records):
+    """A tree shaped like a generated config: many same-shaped records"""
+    return {
+        'service': {'name': 'bench', 'debug': False},
+        'backends': [
+            {'host': 'host-{}.example.com'.format(i), 'port': 8000 + i % 100, 'zone': 'zone-{}'.format(i % 4),
+             'weight': 1, 'tags': ['web', 'primary'], 'health': {'path': '/health', 'interval': 5}}
+            for i in range(records)
+        ],
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    data = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    args = parser.parse_args()
+
+    plain, plain_bytes = measure(lambda: generate(args.records))
+    frozen, frozen_bytes = measure(lambda: freeze(generate(args.records)))
+    print('plain   {:8.2f} MiB'.format(plain_bytes / 1024.0 / 1024.0))
+    print('frozen  {:8.2f} MiB  ({:.0%} of plain)'.format(frozen_bytes / 1024.0 / 1024.0,
+                                                           float(frozen_bytes) / plain_bytes))
+
+    for name, data in (('plain', plain), ('frozen', frozen)):
+        config = yact.Config(None, lookup_cache_size=0)
+        config._publish(data)
+        node = config['backends'][-1]
+        per_call = min(timeit.repeat(lambda: node['health']['path'], number=200000, repeat=3)) / 200000
+        print('{:<7} nested lookup {:7.1f} ns'.format(name, per_call * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Cost of `${...}` interpolation: load time with and without it, lookups
+of resolved values, and `set` re-resolving only the dependents of the
+edited key against resolving every reference again.
+
+    $ python benchmarks/bench_interpolation.py --services 100 1000 5000
+"""
+import os
+import sys
+import shutil
+import timeit
+import argparse
+import tempfile
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+from yact.interpolation import interpolate  # noqa: E402
+
+
+def generate(services):
+    return {'domain': 'example.com', 'base': '/srv',
+            'services': {'svc{}'.format(i): {'host': 'svc{}.${{domain}}'.format(i),
+                                             'data': '${{base}}/svc{}'.format(i),
+                                             'url': 'https://${{services.svc{0}.host}}:{1}/'.format(i, 8000 + i % 1000)}
+                         for i in range(services)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--services', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='yact-interpolation-')
+    try:
+        for services in args.services:
+            path = os.path.join(directory, 'services-{}.yaml'.format(services))
+            with open(path, 'w') as f:
+                yaml.safe_dump(generate(services), f, default_flow_style=False)
+
+            def load(interpolated):
+                return lambda: yact.from_file(path, interpolate=interpolated)
+
+            plain = min(timeit.repeat(load(False), number=1, repeat=args.number))
+            resolved = min(timeit.repeat(load(True), number=1, repeat=args.number))
+            config = yact.from_file(path, interpolate=True, autosave=False)
+            key = 'services.svc{}.url'.format(services // 2)
+            lookup = min(timeit.repeat(lambda: config[key], number=100000, repeat=3)) / 100000
+            edit = min(timeit.repeat(lambda: config.set('services.svc0.host', 'moved.example.com'),
+                                     number=1, repeat=args.number))
+            full = min(timeit.repeat(lambda: interpolate(config._snapshot.source), number=1, repeat=args.number))
+            print('{:>5} services  load {:8.2f} ms (interpolated {:8.2f} ms)  lookup {:5.3f} us  '
+                  'set {:7.3f} ms (full resolve {:8.2f} ms)'.format(services, plain * 1e3, resolved * 1e3,
+                                                                   lookup * 1e6, edit * 1e3, full * 1e3))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
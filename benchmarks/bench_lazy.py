@@ -0,0 +1,60 @@
+"""
+Load time and memory of lazy versus eager loading when a process
+only reads one key of a large generated config.
+
+    $ python benchmarks/bench_lazy.py --sections 500 --entries 100
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--entries', type=int, default=100)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='yact-bench-')
+    try:
+        path = os.path.join(tmpdir, 'generated.yaml')
+        data = {'db': {'host': 'localhost', 'port': 5432}}
+        for s in range(args.sections):
+            data['section{}'.format(s)] = {'entry{}'.format(e): {'value': e, 'tags': ['a', 'b']}
+                                          for e in range(args.entries)}
+        with open(path, 'w') as f:
+            yaml.dump(data, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper), default_flow_style=False)
+        print('config size: {:.1f} MiB'.format(os.path.getsize(path) / 1024.0 / 1024.0))
+
+        for lazy in (False, True):
+            start = perf_counter()
+            config = yact.from_file(path, lazy=lazy)
+            loaded = perf_counter() - start
+            config['db.host']
+            first_read = perf_counter() - start - loaded
+            del config
+
+            tracemalloc.start()  # Separate pass, tracing slows loading down considerably
+            config = yact.from_file(path, lazy=lazy)
+            config['db.host']
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del config
+            print('{:<6} load {:9.1f} ms  first read {:8.3f} ms  resident {:8.1f} MiB  peak {:8.1f} MiB'.format(
+                'lazy' if lazy else 'eager', loaded * 1e3, first_read * 1e3,
+                current / 1024.0 / 1024.0, peak / 1024.0 / 1024.0))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
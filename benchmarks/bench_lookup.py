@@ -0,0 +1,63 @@
+"""
+Repeated dotted-key lookup cost for shallow and deep keys.
+
+Compares an uncached walk (split + walk on every call, the previous
+behaviour), `Config.get`/`__getitem__` with the path and leaf caches,
+and a bound `Config.accessor`.
+
+    $ python benchmarks/bench_lookup.py --depth 8
+"""
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def nested(depth, width):
+    """Build a tree `depth` levels deep with `width` siblings per level."""
+    leaf = 'value'
+    for level in reversed(range(depth)):
+        node = {'k{}'.format(i): 'sibling' for i in range(width)}
+        node['level{}'.format(level)] = leaf
+        leaf = node
+    return leaf
+
+
+def uncached_lookup(data, key):
+    for name in key.split('.'):
+        data = data[name]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depth', type=int, default=8)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args()
+
+    for depth in sorted({1, 3, args.depth}):
+        config = yact.Config(None)
+        config._publish(nested(depth, args.width))
+        key = '.'.join('level{}'.format(i) for i in range(depth))
+        accessor = config.accessor(key)
+        data = config._data
+        cases = [
+            ('uncached walk', lambda: uncached_lookup(data, key)),
+            ('config[key]', lambda: config[key]),
+            ('config.get', lambda: config.get(key)),
+            ('accessor()', accessor),
+        ]
+        baseline = None
+        for name, fn in cases:
+            elapsed = min(timeit.repeat(fn, number=args.number, repeat=3))
+            per_call = elapsed / args.number * 1e9
+            baseline = baseline or per_call
+            print('depth={:<3} {:<14} {:8.1f} ns/call  {:5.2f}x'.format(depth, name, per_call, baseline / per_call))
+
+
+if __name__ == '__main__':
+    main()
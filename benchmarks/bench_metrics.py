@@ -0,0 +1,43 @@
+"""
+Cost of metrics on lookups and edits, with metrics disabled and enabled.
+
+    $ python benchmarks/bench_metrics.py --number 200000
+"""
+import os
+import sys
+import timeit
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--edits', type=int, default=2000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'bench.yaml')
+    with open(filename, 'w') as f:
+        f.write('db:\n  host: localhost\n  port: 5432\n')
+    try:
+        results = {}
+        for metrics in (False, True):
+            config = yact.from_file(filename, metrics=metrics, autosave=False)
+            lookup = min(timeit.repeat(lambda: config['db.host'], number=args.number, repeat=3)) / args.number
+            edit = min(timeit.repeat(lambda: config.set('db.port', 5433), number=args.edits, repeat=3)) / args.edits
+            results[metrics] = (lookup, edit)
+            print('metrics={:<5}  config[key] {:8.1f} ns/call  set {:8.2f} us/call'.format(
+                str(metrics), lookup * 1e9, edit * 1e6))
+        print('enabled overhead: lookup {:+.1f} ns, set {:+.2f} us'.format(
+            (results[True][0] - results[False][0]) * 1e9, (results[True][1] - results[False][1]) * 1e6))
+    finally:
+        os.unlink(filename)
+        os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of getting a loaded config into worker processes: loading it with
+`from_file` in every task, against sending the pickled `Config`, against
+inheriting it through fork.
+
+    $ python benchmarks/bench_pickle.py --services 100 1000 10000 --tasks 50
+"""
+import os
+import sys
+import shutil
+import pickle
+import argparse
+import tempfile
+import multiprocessing
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+_inherited = None
+
+
+def generate(services):
+    return {'services': {'svc{}'.format(i): {'host': 'svc{}.example.com'.format(i), 'port': 8000 + i % 1000,
+                                             'tags': ['a', 'b', 'c']} for i in range(services)}}
+
+
+def task_load(path):
+    return yact.from_file(path)['services.svc0.host']
+
+
+def task_pickled(config):
+    return config['services.svc0.host']
+
+
+def task_inherited(_):
+    return _inherited['services.svc0.host']
+
+
+def run(pool, fn, args):
+    start = perf_counter()
+    list(pool.map(fn, args))
+    return perf_counter() - start
+
+
+def main():
+    global _inherited
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--services', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('fork')
+    directory = tempfile.mkdtemp(prefix='yact-pickle-')
+    try:
+        for services in args.services:
+            path = os.path.join(directory, 'services-{}.yaml'.format(services))
+            with open(path, 'w') as f:
+                yaml.safe_dump(generate(services), f, default_flow_style=False)
+            config = _inherited = yact.from_file(path)
+            start = perf_counter()
+            raw = pickle.dumps(config)
+            pickle.loads(raw)
+            roundtrip = perf_counter() - start
+            with ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+                pool.submit(task_inherited, None).result()  # Start the workers outside the timings
+                load = run(pool, task_load, [path] * args.tasks)
+                pickled = run(pool, task_pickled, [config] * args.tasks)
+                inherited = run(pool, task_inherited, [None] * args.tasks)
+            print('{:>6} services  pickle {:7.1f} KiB {:7.2f} ms  {} tasks: from_file {:8.1f} ms  '
+                  'pickled {:8.1f} ms  forked {:6.1f} ms'.format(services, len(raw) / 1024.0, roundtrip * 1e3,
+                                                                 args.tasks, load * 1e3, pickled * 1e3,
+                                                                 inherited * 1e3))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
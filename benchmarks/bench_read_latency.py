@@ -0,0 +1,107 @@
+"""
+Multi-threaded read latency while the config is being reloaded.
+
+Reader threads hammer `Config.__getitem__` while a writer thread
+continuously calls `refresh()` and `set()`. Latencies are reported
+for an idle run and a run with concurrent reloads, for both the
+lock-free snapshot reads and a baseline that takes the writer lock
+on every read (the previous behaviour).
+
+    $ python benchmarks/bench_read_latency.py --readers 8 --keys 2000
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import threading
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+class LockedReadConfig(yact.Config):
+    """Baseline: every read takes the writer lock."""
+
+    def __getitem__(self, item):
+        with self._lock:
+            return super(LockedReadConfig, self).__getitem__(item)
+
+
+def generate(path, keys):
+    data = {'db': {'host': 'localhost', 'port': 5432}}
+    data['generated'] = {'key{}'.format(i): {'value': i, 'name': 'item-{}'.format(i)} for i in range(keys)}
+    with open(path, 'w') as f:
+        yaml.dump(data, f, default_flow_style=False)
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))]
+
+
+def run(config, readers, duration, reload):
+    stop = threading.Event()
+    results = []
+
+    def reader():
+        latencies = []
+        while not stop.is_set():
+            start = perf_counter()
+            config['db.host']
+            latencies.append(perf_counter() - start)
+        results.append(latencies)
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            config.refresh()
+            config.set('db.port', i)
+            i += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    if reload:
+        threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    stop.wait(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    samples = [s for r in results for s in r]
+    return {
+        'reads': len(samples),
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+        'p999_us': percentile(samples, 99.9) * 1e6,
+        'max_us': max(samples) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--keys', type=int, default=2000, help='generated entries (controls reload cost)')
+    parser.add_argument('--duration', type=float, default=2.0)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='yact-bench-')
+    try:
+        path = os.path.join(tmpdir, 'bench.yaml')
+        generate(path, args.keys)
+        for cls in (yact.Config, LockedReadConfig):
+            config = cls(path)
+            config.refresh()
+            for reload in (False, True):
+                stats = run(config, args.readers, args.duration, reload)
+                print('{:<18} reloads={!s:<5} reads={reads:>9} p50={p50_us:8.2f}us p99={p99_us:8.2f}us '
+                      'p99.9={p999_us:10.2f}us max={max_us:10.2f}us'.format(cls.__name__, reload, **stats))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-worker cost of loading and polling a config: every worker parsing
+and watching the file itself (`from_file`) versus following a snapshot
+published once by the master (`from_shared`).
+
+    $ python benchmarks/bench_shared.py --workers 16 --entries 5000
+"""
+import os
+import sys
+import shutil
+import timeit
+import argparse
+import tempfile
+import multiprocessing
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def generate(path, entries):
+    data = {'entries': {'entry{}'.format(i): {'host': 'host-{}'.format(i), 'port': i} for i in range(entries)}}
+    with open(path, 'w') as f:
+        yaml.dump(data, f, default_flow_style=False)
+
+
+def worker(load, queue):
+    start = perf_counter()
+    config = load()
+    elapsed = perf_counter() - start
+    poll = min(timeit.repeat(lambda: config.config_file_changed, number=10000, repeat=3)) / 10000
+    queue.put((elapsed, poll))
+
+
+def run(load, workers):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [context.Process(target=worker, args=(load, queue)) for _ in range(workers)]
+    start = perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    total = perf_counter() - start
+    for process in processes:
+        process.join()
+    return total, sum(r[0] for r in results) / workers, sum(r[1] for r in results) / workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--entries', type=int, default=5000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='yact-shared-')
+    try:
+        path = os.path.join(directory, 'app.yaml')
+        generate(path, args.entries)
+        master = yact.from_file(path)
+        yact.share(master, os.path.join(directory, 'app.yact'))
+        cases = [
+            ('from_file', lambda: yact.from_file(path)),
+            ('from_shared', lambda: yact.from_shared(os.path.join(directory, 'app.yact'))),
+            ('from_shared frozen', lambda: yact.from_shared(os.path.join(directory, 'app.yact'), frozen=True)),
+        ]
+        for name, load in cases:
+            total, load_time, poll = run(load, args.workers)
+            print('{:<19} {} workers: all loaded in {:8.1f} ms, {:7.2f} ms per worker, poll {:7.2f} us'.format(
+                name, args.workers, total * 1e3, load_time * 1e3, poll * 1e6))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
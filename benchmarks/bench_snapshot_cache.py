@@ -0,0 +1,60 @@
+"""
+Cold start time of `yact.from_file` on a large config with and
+without the on-disk snapshot cache.
+
+Each measurement runs in a fresh interpreter so nothing is shared
+between loads except what is on disk.
+
+    $ python benchmarks/bench_snapshot_cache.py --entries 20000
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import yaml
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+LOAD = """
+import sys, time
+sys.path.insert(0, {root!r})
+import yact
+start = time.perf_counter()
+yact.from_file({path!r}, snapshot_cache={cache!r})
+print(time.perf_counter() - start)
+"""
+
+
+def load_time(path, cache):
+    code = LOAD.format(root=ROOT, path=path, cache=cache)
+    return float(subprocess.check_output([sys.executable, '-c', code]).decode().strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='yact-bench-')
+    try:
+        path = os.path.join(tmpdir, 'large.yaml')
+        cache = os.path.join(tmpdir, 'cache')
+        data = {'entries': {'entry{}'.format(i): {'host': 'host-{}'.format(i), 'port': i, 'tags': ['a', 'b']}
+                            for i in range(args.entries)}}
+        with open(path, 'w') as f:
+            yaml.dump(data, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper), default_flow_style=False)
+        print('config size: {:.1f} MiB'.format(os.path.getsize(path) / 1024.0 / 1024.0))
+
+        print('no cache     {:9.2f} ms'.format(min(load_time(path, None) for _ in range(args.repeat)) * 1e3))
+        print('cache build  {:9.2f} ms'.format(load_time(path, cache) * 1e3))
+        print('warm cache   {:9.2f} ms'.format(min(load_time(path, cache) for _ in range(args.repeat)) * 1e3))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
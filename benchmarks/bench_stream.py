@@ -0,0 +1,68 @@
+"""
+Reload cost of an append-only multi-document YAML stream: parsing the
+whole file on every change versus parsing only appended documents.
+
+    $ python benchmarks/bench_stream.py --documents 100 1000 10000 --append 10
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def document(i):
+    return {'id': i, 'name': 'record-{}'.format(i), 'hosts': ['h{}-{}'.format(i, n) for n in range(5)],
+            'limits': {'cpu': i % 16, 'memory': '{}Mi'.format(128 * (i % 8 + 1))}}
+
+
+def append(path, start, count):
+    with open(path, 'a') as f:
+        yaml.dump_all((document(i) for i in range(start, start + count)), f, explicit_start=True,
+                      default_flow_style=False)
+
+
+def reload_time(config, path, start, append_count, rounds, incremental):
+    times = []
+    for r in range(rounds):
+        append(path, start + r * append_count, append_count)
+        if not incremental:
+            config._stream.reset()  # Forget the checkpoint, forcing a full parse
+        begin = perf_counter()
+        config.refresh()
+        times.append(perf_counter() - begin)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--append', type=int, default=10, help='documents appended per reload')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='yact-stream-')
+    try:
+        for count in args.documents:
+            results = {}
+            for name, incremental in (('full', False), ('incremental', True)):
+                path = os.path.join(directory, '{}-{}.yaml'.format(name, count))
+                append(path, 0, count)
+                config = yact.from_file(path, multi_document=True)
+                results[name] = reload_time(config, path, count, args.append, args.rounds, incremental)
+                size = os.path.getsize(path)
+            print('{:>7} documents {:>9.1f} KiB  +{} per reload: full {:9.2f} ms  incremental {:8.2f} ms  {:6.1f}x'.format(
+                count, size / 1024.0, args.append, results['full'] * 1e3, results['incremental'] * 1e3,
+                results['full'] / results['incremental']))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
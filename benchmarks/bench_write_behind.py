@@ -0,0 +1,91 @@
+"""
+`Config.set` throughput and reader tail latency while several threads
+toggle flags, with synchronous saves and with write-behind saving.
+
+    $ python benchmarks/bench_write_behind.py --writers 4 --readers 4 --duration 2
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+
+
+def write(path, flags):
+    data = {'flags': {'flag{}'.format(i): False for i in range(flags)},
+            'services': {'svc{}'.format(i): {'host': 'svc{}.example.com'.format(i), 'port': 8000 + i}
+                         for i in range(500)}}
+    with open(path, 'w') as f:
+        yaml.dump(data, f, default_flow_style=False)
+
+
+def run(path, write_behind, args):
+    config = yact.from_file(path, write_behind=write_behind)
+    stop = threading.Event()
+    barrier = threading.Barrier(args.writers + args.readers + 1)
+    edits, latencies = [], []
+
+    def writer(n):
+        count = 0
+        barrier.wait()
+        while not stop.is_set():
+            config.set('flags.flag{}'.format((n + count) % args.flags), count % 2 == 0)
+            count += 1
+        edits.append(count)
+
+    def reader(n):
+        samples = []
+        key = 'services.svc{}.host'.format(n)
+        barrier.wait()
+        while not stop.is_set():
+            start = perf_counter()
+            config.get(key)
+            samples.append(perf_counter() - start)
+        latencies.extend(samples)
+
+    threads = ([threading.Thread(target=writer, args=(i,)) for i in range(args.writers)] +
+               [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)])
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = perf_counter()
+    sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    config.flush()
+    latencies.sort()
+    return sum(edits) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--flags', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--debounce', type=float, default=0.5, help='write-behind debounce in seconds')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='yact-write-behind-')
+    try:
+        for name, write_behind in (('sync', False), ('write-behind', args.debounce)):
+            path = os.path.join(directory, '{}.yaml'.format(name))
+            write(path, args.flags)
+            throughput, median, p99 = run(path, write_behind, args)
+            print('{:<13} set {:>10.0f}/s   get median {:7.2f} us  p99 {:8.2f} us'.format(
+                name, throughput, median * 1e6, p99 * 1e6))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Parse and dump time of the pure-Python and libyaml YAML backends
+across generated config sizes.
+
+    $ python benchmarks/bench_yaml_backends.py --sizes 100 1000 10000
+"""
+import os
+import sys
+import argparse
+from time import perf_counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from yact.backends import YAMLBackend  # noqa: E402
+
+
+def generate(entries):
+    return {
+        'service': {'name': 'bench', 'debug': False},
+        'entries': {
+            'entry{}'.format(i): {
+                'host': 'host-{}.example.com'.format(i),
+                'port': 1024 + i,
+                'weight': i / 3.0,
+                'tags': ['a', 'b', 'c'],
+            } for i in range(entries)
+        },
+    }
+
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [('pure', YAMLBackend(use_libyaml=False)), ('libyaml', YAMLBackend())]
+    if not backends[1][1].libyaml:
+        print('PyYAML was built without libyaml; both rows use the pure-Python implementation')
+    for size in args.sizes:
+        data = generate(size)
+        raw = backends[0][1].dump(data)
+        results = {}
+        for name, backend in backends:
+            results[name] = (best(lambda: backend.load(raw), args.repeat),
+                             best(lambda: backend.dump(data), args.repeat))
+        for name, (load, dump) in results.items():
+            print('{:>7} entries {:>9.1f} KiB {:<8} load {:9.2f} ms  dump {:9.2f} ms  speedup load {:5.1f}x dump {:5.1f}x'.format(
+                size, len(raw) / 1024.0, name, load * 1e3, dump * 1e3,
+                results['pure'][0] / load, results['pure'][1] / dump))
+
+
+if __name__ == '__main__':
+    main()
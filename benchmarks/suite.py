@@ -0,0 +1,281 @@
+"""
+Reproducible benchmark suite for the load, lookup, write and watch paths.
+
+Configs are generated synthetically at several sizes (leaf entries) and
+depths (nesting levels). Measured:
+
+* cold_load: `from_file` of a freshly written file
+* get_throughput: `Config.get` calls per second from 1 and N threads
+* set: `Config.set` cost with autosave off
+* save: `Config.save` cost
+* watch_idle: watcher CPU time per idle watched config
+* reload_latency: time from a file being replaced until `get` returns
+  the new value, with inotify and with polling
+
+Results are written as JSON. Pass `--compare` with an earlier run to
+flag regressions:
+
+    $ python benchmarks/suite.py --output base.json
+    $ python benchmarks/suite.py --output new.json --compare base.json
+"""
+import os
+import sys
+import json
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import threading
+from time import perf_counter, process_time, sleep, time
+
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+import yact  # noqa: E402
+from yact.watch import WatchScheduler  # noqa: E402
+
+
+def generate(size, depth):
+    """
+    Return `(data, keys)`: a tree with `size` leaf records nested `depth`
+    levels deep, and the dotted key of every record's `host`
+    """
+    fanout = max(2, int(round(size ** (1.0 / depth))))
+    data, keys = {}, []
+    for i in range(size):
+        path, n = [], i
+        for level in range(depth - 1):
+            path.append('n{}'.format(n % fanout))
+            n //= fanout
+        path.append('entry{}'.format(i))
+        node = data
+        for name in path[:-1]:
+            node = node.setdefault(name, {})
+        node[path[-1]] = {'host': 'host-{}.example.com'.format(i), 'port': 1024 + i % 60000, 'enabled': i % 2 == 0}
+        keys.append('.'.join(path + ['host']))
+    return data, keys
+
+
+def write(path, data):
+    with open(path, 'w') as f:
+        yaml.dump(data, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper), default_flow_style=False)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        times.append(perf_counter() - start)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def bench_cold_load(path, repeat):
+    fastest, median = timed(lambda: yact.from_file(path), repeat)
+    return {'min_ms': fastest * 1e3, 'median_ms': median * 1e3, 'file_kib': os.path.getsize(path) / 1024.0}
+
+
+def bench_get(config, keys, threads, duration):
+    stop = threading.Event()
+    counts = []
+    barrier = threading.Barrier(threads + 1)
+
+    def reader(seed):
+        sample = random.Random(seed).sample(keys, min(len(keys), 1000))
+        get = config.get
+        calls = 0
+        barrier.wait()
+        while not stop.is_set():
+            for key in sample:
+                get(key)
+            calls += len(sample)
+        counts.append(calls)
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = perf_counter()
+    sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return {'threads': threads, 'calls_per_s': sum(counts) / (perf_counter() - start)}
+
+
+def bench_set(config, keys, number):
+    sample = random.Random(0).sample(keys, min(len(keys), number))
+    start = perf_counter()
+    for i, key in enumerate(sample):
+        config.set(key, 'edited-{}'.format(i))
+    return {'per_call_us': (perf_counter() - start) / len(sample) * 1e6}
+
+
+def bench_save(config, repeat):
+    fastest, median = timed(config.save, repeat)
+    return {'min_ms': fastest * 1e3, 'median_ms': median * 1e3}
+
+
+def bench_watch_idle(directory, configs, interval, window):
+    scheduler = WatchScheduler()
+    try:
+        watched = []
+        for i in range(configs):
+            path = os.path.join(directory, 'idle{}.yaml'.format(i))
+            write(path, {'value': i})
+            config = yact.from_file(path)
+            config.start_file_watch(interval, scheduler)
+            watched.append(config)
+        sleep(interval)  # Let the first round of checks settle
+        cpu, wall = process_time(), perf_counter()
+        sleep(window)
+        cpu, wall = process_time() - cpu, perf_counter() - wall
+        return {'configs': configs, 'interval_s': interval,
+                'cpu_us_per_config_per_s': cpu / wall / configs * 1e6}
+    finally:
+        scheduler.shutdown(timeout=5)
+
+
+def bench_reload_latency(directory, use_inotify, interval, rounds):
+    path = os.path.join(directory, 'reload-{}.yaml'.format('inotify' if use_inotify else 'poll'))
+    write(path, {'marker': -1})
+    scheduler = WatchScheduler(use_inotify=use_inotify)
+    try:
+        config = yact.from_file(path)
+        config.start_file_watch(interval, scheduler)
+        latencies = []
+        for i in range(rounds):
+            sleep(0.05)  # Keep rounds apart so each write is seen separately
+            tmp = path + '.tmp'
+            write(tmp, {'marker': i})
+            start = perf_counter()
+            os.replace(tmp, path)
+            deadline = start + max(10, interval * 4)
+            while config.get('marker') != i:
+                if perf_counter() > deadline:
+                    raise RuntimeError('Reload of {} not visible after {}s'.format(path, deadline - start))
+                sleep(0.0005)
+            latencies.append(perf_counter() - start)
+        latencies.sort()
+        return {'inotify': bool(use_inotify and scheduler._notifier is not None), 'interval_s': interval,
+                'median_ms': latencies[len(latencies) // 2] * 1e3, 'max_ms': latencies[-1] * 1e3}
+    finally:
+        scheduler.shutdown(timeout=5)
+
+
+def run(args, directory):
+    results = []
+
+    def record(benchmark, params, metrics):
+        results.append({'benchmark': benchmark, 'params': params, 'metrics': metrics})
+        print('{:<16} {:<40} {}'.format(benchmark, json.dumps(params, sort_keys=True),
+                                        ' '.join('{}={:.3f}'.format(k, v) if isinstance(v, float) else
+                                                 '{}={}'.format(k, v) for k, v in sorted(metrics.items()))))
+
+    selected = set(args.only or ['cold_load', 'get', 'set', 'save', 'watch_idle', 'reload_latency'])
+    for size in args.sizes:
+        for depth in args.depths:
+            params = {'size': size, 'depth': depth}
+            data, keys = generate(size, depth)
+            path = os.path.join(directory, 'config-{}-{}.yaml'.format(size, depth))
+            write(path, data)
+            if 'cold_load' in selected:
+                record('cold_load', params, bench_cold_load(path, args.repeat))
+            config = yact.from_file(path, autosave=False)
+            if 'get' in selected:
+                for threads in sorted({1, args.threads}):
+                    record('get_throughput', dict(params, threads=threads),
+                           bench_get(config, keys, threads, args.duration))
+            if 'set' in selected:
+                record('set', params, bench_set(config, keys, args.edits))
+            if 'save' in selected:
+                record('save', params, bench_save(config, args.repeat))
+    if 'watch_idle' in selected:
+        for configs in args.watched:
+            record('watch_idle', {'configs': configs},
+                   bench_watch_idle(directory, configs, args.interval, args.duration))
+    if 'reload_latency' in selected:
+        for use_inotify in (True, False):
+            record('reload_latency', {'inotify': use_inotify},
+                   bench_reload_latency(directory, use_inotify, args.interval, args.rounds))
+    return results
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_s')
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every timing metric against baseline and
+    return the number of regressions beyond threshold
+    """
+    previous = {(r['benchmark'], json.dumps(r['params'], sort_keys=True)): r['metrics'] for r in baseline['results']}
+    regressions = 0
+    for result in results:
+        before = previous.get((result['benchmark'], json.dumps(result['params'], sort_keys=True)))
+        if before is None:
+            continue
+        for metric, value in sorted(result['metrics'].items()):
+            old = before.get(metric)
+            if not isinstance(value, float) or not old or metric in ('file_kib', 'interval_s'):
+                continue
+            change = value / old - 1
+            worse = -change if higher_is_better(metric) else change
+            flag = 'REGRESSION' if worse > threshold else ''
+            regressions += bool(flag)
+            print('{:<16} {:<40} {:<24} {:+7.1%} {}'.format(result['benchmark'], json.dumps(result['params'],
+                  sort_keys=True), metric, change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 6])
+    parser.add_argument('--threads', type=int, default=4, help='reader threads for the multi-threaded get run')
+    parser.add_argument('--duration', type=float, default=1.0, help='seconds per throughput/CPU measurement')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--edits', type=int, default=1000)
+    parser.add_argument('--watched', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--interval', type=float, default=0.1, help='watch interval used by the watch benchmarks')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--only', nargs='+', choices=['cold_load', 'get', 'set', 'save', 'watch_idle', 'reload_latency'])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='yact-suite-')
+    try:
+        results = run(args, directory)
+    finally:
+        shutil.rmtree(directory)
+    report = {
+        'meta': {
+            'timestamp': time(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'yact': yact.__version__,
+            'libyaml': bool(getattr(yaml, '__with_libyaml__', False)),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print('{} regression(s) beyond {:.0%}'.format(regressions, args.threshold))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,8 +19,9 @@ setup(
     version=__version__,
     url="https://github.com/jesseops/yact",
     install_requires=__requires__,
-    extras_require={'test': ['nosetests']},
+    extras_require={'test': ['pytest']},
     packages=['yact'],
+    python_requires='>=3.8',
     description=__desc__,
     long_description=__longdesc__,
     license='MIT',
@@ -30,12 +31,12 @@ setup(
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ]
 )
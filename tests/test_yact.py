@@ -1,10 +1,22 @@
 import os
 import shutil
+import typing
+import dataclasses
+import asyncio
+import pickle
 import hashlib
+import collections
+import tempfile
 import unittest
+import threading
+import multiprocessing
 from time import sleep
 
+import yaml
+
 import yact
+import yact.shared
+import yact.watch
 
 
 class test_yact(unittest.TestCase):
@@ -26,6 +38,40 @@ class test_yact(unittest.TestCase):
         with self.assertRaises(yact.MissingConfig):
             _ = yact.from_file('bogusfile')
 
+    def test_from_file_create_if_missing(self):
+        directory = tempfile.mkdtemp()
+        try:
+            config = yact.from_file('created.yaml', directory, create_if_missing=True)
+            self.assertEqual(config.filename, os.path.join(directory, 'created.yaml'))
+            self.assertEqual(config.sections, [])
+            config.set('my.new.setting', True)
+            self.assertTrue(yact.from_file(config.filename)['my.new.setting'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_from_files(self):
+        configs = yact.from_files(['test.yaml', self.sample_cfg], 'tests')
+        self.assertEqual([c.filename for c in configs], [os.path.join('tests', 'test.yaml'), self.sample_cfg])
+        self.assertEqual(configs[1]['db.host'], 'localhost')
+        with self.assertRaises(yact.MissingConfig):
+            yact.from_files(['test.yaml', 'bogusfile'], 'tests')
+
+    def test_load_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for i in range(5):
+                with open(os.path.join(directory, '{:02d}-fragment.yaml'.format(i)), 'w') as f:
+                    f.write('shared: {}\nfragment{}: true\n'.format(i, i))
+            with open(os.path.join(directory, 'ignored.txt'), 'w') as f:
+                f.write('shared: ignored\n')
+            configs = yact.load_directory(directory)
+            self.assertEqual([c['shared'] for c in configs], list(range(5)))
+            merged = yact.load_directory(directory, merge=True, processes=True)
+            self.assertEqual(merged['shared'], 4)  # Later files win
+            self.assertTrue(merged['fragment0'])
+        finally:
+            shutil.rmtree(directory)
+
     def test_remove(self):
         config = yact.from_file(self.sample_cfg)
         config.set('temporary', True)
@@ -75,6 +121,633 @@ class test_yact(unittest.TestCase):
         with self.assertRaises(KeyError):
             config['missingentry']
 
+    def test_snapshot_isolation(self):
+        config = yact.from_file(self.sample_cfg)
+        db = config['db']
+        config.set('db.host', 'elsewhere')
+        self.assertEqual(db['host'], 'localhost')  # Old snapshot untouched
+        self.assertEqual(config['db.host'], 'elsewhere')
+        config.remove('db.host')
+        self.assertEqual(db['host'], 'localhost')
+        self.assertIsNone(config.get('db.host'))
+
+    def test_reads_do_not_take_lock(self):
+        config = yact.from_file(self.sample_cfg)
+        with config._lock:  # Simulate a writer mid-save/refresh
+            self.assertEqual(config['db.host'], 'localhost')
+            self.assertEqual(config.get('environment'), 'development')
+            self.assertIn('db', config.sections)
+
+    def test_lookup_cache_invalidated(self):
+        config = yact.from_file(self.sample_cfg)
+        generation = config.generation
+        self.assertEqual(config['db.host'], 'localhost')
+        self.assertEqual(config['db.host'], 'localhost')  # Served from cache
+        config.set('db.host', 'elsewhere')
+        self.assertGreater(config.generation, generation)
+        self.assertEqual(config['db.host'], 'elsewhere')
+        config.remove('db.host')
+        with self.assertRaises(KeyError):
+            config['db.host']
+
+    def test_bulk_queries(self):
+        config = yact.from_file(self.sample_cfg, autosave=False)
+        self.assertEqual(config.get_many(['db.host', 'db.port', 'db.missingentry'], 'fallback'),
+                         {'db.host': 'localhost', 'db.port': 27017, 'db.missingentry': 'fallback'})
+        self.assertEqual(config.items('db'), [('db.dbname', 'test'), ('db.host', 'localhost'), ('db.port', 27017)])
+        self.assertEqual(len(config.items()), 6)
+        self.assertEqual(config.find('*.level'), [('logging.level', 'INFO')])
+        config.set('db.replica.host', 'replica')
+        config.set('db-x.host', 'unrelated')  # Sorts between 'db' and 'db.*' entries
+        self.assertEqual(config.find('db*.host'), [('db-x.host', 'unrelated'), ('db.host', 'localhost')])
+        self.assertEqual(config.find('db.*.host'), [('db.replica.host', 'replica')])
+        self.assertEqual(config.find('db.replica'), [('db.replica', {'host': 'replica'})])
+        config.remove('db.host')
+        self.assertEqual([key for key, _ in config.items('db')], ['db.dbname', 'db.port', 'db.replica.host'])
+        self.assertEqual(config.items('missing'), [])
+
+    def test_interpolation(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'interpolated.yaml')
+            with open(filename, 'w') as f:
+                f.write('db:\n  host: db1\n  port: 5432\n  url: pg://${db.host}:${db.port}/app\n'
+                        'backup:\n  db: ${db}\n  port: ${db.port}\n'
+                        'paths:\n  home: ${env:HOME}\n  logs: ${env:YACT_TEST_UNSET:-/var/log}/app\n'
+                        'literal: $${db.host}\n')
+            config = yact.from_file(filename, interpolate=True)
+            self.assertEqual(config['db.url'], 'pg://db1:5432/app')
+            self.assertEqual(config['backup.db.url'], 'pg://db1:5432/app')  # Resolved before being referenced
+            self.assertEqual(config['backup.port'], 5432)  # Lone references keep their type
+            self.assertEqual(config['paths.home'], os.environ['HOME'])
+            self.assertEqual(config['paths.logs'], '/var/log/app')
+            self.assertEqual(config['literal'], '${db.host}')
+            config.set('db.host', 'db2')
+            self.assertEqual(config['db.url'], 'pg://db2:5432/app')
+            self.assertEqual(config['backup.db.host'], 'db2')
+            self.assertEqual(config.find('backup.db.url'), [('backup.db.url', 'pg://db2:5432/app')])
+            with open(filename) as f:
+                self.assertIn('${db.host}', f.read())  # References are saved, not their results
+            with self.assertRaises(yact.ConfigEditFailed):
+                config.set('db.host', '${db.url}')  # Cycle
+            with self.assertRaises(yact.ConfigEditFailed):
+                config.remove('db.port')
+            self.assertEqual(config['db.url'], 'pg://db2:5432/app')
+            with open(filename, 'w') as f:
+                f.write('a: ${b}\nb: ${a}\n')
+            with self.assertRaises(yact.InvalidConfigFile):
+                config.refresh()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_interpolation_with_overrides(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'interpolated.yaml')
+            with open(filename, 'w') as f:
+                f.write('db:\n  host: db1\n  url: pg://${db.host}/app\nenvironment: dev\n')
+            environ = {'APP_DB__HOST': 'db1.prod'}
+            config = yact.from_file(filename, interpolate=True, autosave=False,
+                                    overrides=yact.Overrides(env_prefix='APP', environ=environ))
+            self.assertEqual(config['db.url'], 'pg://db1.prod/app')
+            environ['APP_DB__HOST'] = 'db2.prod'
+            config.set('environment', 'production')  # Unrelated edit picks up the new environment
+            self.assertEqual(config['db.host'], 'db2.prod')
+            self.assertEqual(config['db.url'], 'pg://db2.prod/app')
+            self.assertEqual(config.find('db.url'), [('db.url', 'pg://db2.prod/app')])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_accessor(self):
+        config = yact.from_file(self.sample_cfg)
+        db_host = config.accessor('db.host')
+        self.assertEqual(db_host(), 'localhost')
+        config.set('db.host', 'elsewhere')
+        self.assertEqual(db_host(), 'elsewhere')
+        missing = config.accessor('db.missingentry')
+        with self.assertRaises(KeyError):
+            missing()
+        self.assertEqual(config.accessor('db.missingentry', 'fallback')(), 'fallback')
+        config.set('hosts', ['a', 'b'])
+        self.assertEqual(config.accessor('hosts.1')(), 'b')
+        self.assertEqual(config.accessor('hosts.2', 'fallback')(), 'fallback')
+        self.assertEqual(config.accessor('environment.x', 'fallback')(), 'fallback')
+        with self.assertRaises(KeyError):
+            config.accessor('environment.x')()
+
+    def test_batch(self):
+        config = yact.from_file(self.sample_cfg)
+        saves = []
+        save = config.save
+        config.save = lambda: saves.append(save())
+        with config.batch():
+            for i in range(50):
+                config.set('batched.key{}'.format(i), i)
+            config.remove('batched.key0')
+            with config.transaction():  # Nested batches save with the outermost one
+                config.set('nested', True)
+            self.assertEqual(saves, [])
+        self.assertEqual(len(saves), 1)
+        self.assertEqual(yact.from_file(config.filename)['batched.key49'], 49)
+
+    def test_batch_entered_after_edit(self):
+        config = yact.from_file(self.sample_cfg)
+        entered = threading.Event()
+
+        def empty_batch():
+            with config.batch():
+                entered.set()
+                sleep(0.2)
+
+        def enter_batch(key, old, new):  # Runs between the edit releasing the lock and its save
+            threading.Thread(target=empty_batch).start()
+            entered.wait(5)
+
+        config.subscribe('db.host', enter_batch)
+        config.set('db.host', 'B')
+        self.assertEqual(yact.from_file(config.filename)['db.host'], 'B')
+
+    def test_batch_rollback(self):
+        config = yact.from_file(self.sample_cfg)
+        md5 = config.md5sum
+        with self.assertRaises(RuntimeError):
+            with config.batch():
+                config.set('db.host', 'elsewhere')
+                config.remove('environment')
+                raise RuntimeError('abort')
+        self.assertEqual(config['db.host'], 'localhost')
+        self.assertEqual(config['environment'], 'development')
+        self.assertEqual(config.md5sum, md5)
+        self.assertFalse(config.config_file_changed)
+
+    def test_autosave_disabled(self):
+        config = yact.from_file(self.sample_cfg, autosave=False)
+        config.set('db.host', 'elsewhere')
+        self.assertEqual(yact.from_file(config.filename)['db.host'], 'localhost')
+        config.save()
+        self.assertEqual(yact.from_file(config.filename)['db.host'], 'elsewhere')
+
+    def test_subscribe(self):
+        config = yact.from_file(self.sample_cfg)
+        calls = []
+        config.subscribe('db', lambda *args: calls.append(('db',) + args))
+        config.subscribe('db.host', lambda *args: calls.append(('db.host',) + args))
+        config.subscribe('logging', lambda *args: calls.append(('logging',) + args))
+        config.set('db.port', 5432)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][:2], ('db', 'db'))
+        self.assertEqual(calls[0][3]['port'], 5432)
+        del calls[:]
+        config.set('db', {'host': 'elsewhere'})  # Replacing an ancestor reaches subscribed children
+        self.assertEqual(sorted(c[0] for c in calls), ['db', 'db.host'])
+        self.assertEqual([c[2:] for c in calls if c[0] == 'db.host'], [('localhost', 'elsewhere')])
+        del calls[:]
+        with open(config.filename, 'a') as f:
+            f.write('modified: True')
+        config.refresh()
+        self.assertEqual(calls, [])  # Untouched subtrees do not fire
+
+    def test_subscribe_wildcard(self):
+        config = yact.from_file(self.sample_cfg)
+        config.set('servers', {'a': {'host': 'a1'}, 'b': {'host': 'b1'}})
+        calls = []
+        subscription = config.subscribe('servers.*.host', lambda *args: calls.append(args))
+        config.set('servers.b.host', 'b2')
+        self.assertEqual(calls, [('servers.b.host', 'b1', 'b2')])
+        with config.batch():  # One notification per batch
+            config.set('servers.a.host', 'a2')
+            config.set('servers.c.host', 'c1')
+        self.assertEqual(sorted(calls[1:]), [('servers.a.host', 'a1', 'a2'), ('servers.c.host', None, 'c1')])
+        config.unsubscribe(subscription)
+        config.set('servers.a.host', 'a3')
+        self.assertEqual(len(calls), 3)
+
+    def test_diff(self):
+        from yact.diff import diff
+        old = {'a': {'b': 1, 'c': [1, 2]}, 'd': 'same', 'e': 1}
+        new = {'a': {'b': 2, 'c': [1, 2]}, 'd': 'same', 'e': True, 'f': None}
+        self.assertEqual(sorted(diff(old, new)), [('a', 'b'), ('e',), ('f',)])
+        self.assertEqual(list(diff(old, old)), [])
+
+    def test_layered_config(self):
+        directory = tempfile.mkdtemp()
+        try:
+            override = os.path.join(directory, 'override.yaml')
+            with open(override, 'w') as f:
+                f.write('db:\n  host: db1.prod\nextra: true\n')
+            config = yact.LayeredConfig([self.sample_cfg, override])
+            self.assertEqual(config['db.host'], 'db1.prod')
+            self.assertEqual(config['db.port'], 27017)  # Merged from the base layer
+            self.assertTrue(config['extra'])
+            self.assertEqual(config['environment'], 'development')
+
+            logging = config['logging']
+            config.layers[0].set('db.dbname', 'prod')
+            self.assertEqual(config['db.dbname'], 'prod')
+            self.assertIs(config['logging'], logging)  # Untouched sections are not re-merged
+
+            config.set('db.port', 5432)  # Writes go to the top layer
+            self.assertEqual(yact.from_file(override)['db.port'], 5432)
+            self.assertEqual(config['db.port'], 5432)
+            config.remove('db')
+            self.assertEqual(config['db.host'], 'localhost')
+            config.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_lazy(self):
+        from yact.lazy import Deferred
+        config = yact.from_file(self.sample_cfg, lazy=True)
+        self.assertEqual(sorted(config.sections), ['db', 'environment', 'logging'])
+        self.assertIsInstance(config._data['db'], Deferred)
+        self.assertFalse(config._data['logging'].loaded)
+        self.assertEqual(config['db.host'], 'localhost')
+        self.assertTrue(config._data['db'].loaded)
+        self.assertFalse(config._data['logging'].loaded)  # Untouched sections stay unparsed
+        config.set('logging.level', 'DEBUG')
+        self.assertEqual(config['logging.filename'], 'sample.log')
+        eager = yact.from_file(config.filename)  # Saving writes every section
+        self.assertEqual(eager['logging.level'], 'DEBUG')
+        self.assertEqual(eager['environment'], 'development')
+        self.assertEqual(eager['db.port'], 27017)
+
+    def test_lazy_fallback(self):
+        from yact.lazy import Deferred
+        filename = self.sample_cfg
+        with open(filename, 'a') as f:
+            f.write('defaults: &defaults {retries: 3}\nservice:\n  <<: *defaults\n')
+        config = yact.from_file(filename, lazy=True)  # Aliases cross sections, load eagerly
+        self.assertNotIsInstance(config._data['db'], Deferred)
+        self.assertEqual(config['service.retries'], 3)
+
+    def test_frozen(self):
+        filename = self.sample_cfg
+        with open(filename, 'a') as f:
+            f.write('servers:\n- {host: a, port: 1}\n- {host: b, port: 2}\n')
+        config = yact.from_file(filename, frozen=True)
+        self.assertEqual(config['db.host'], 'localhost')
+        self.assertEqual(config.get('db.missingentry', 'x'), 'x')
+        self.assertEqual(sorted(config.sections), ['db', 'environment', 'logging', 'servers'])
+        self.assertIsInstance(config['db'], yact.FrozenMapping)
+        self.assertIsInstance(config['servers'], tuple)
+        self.assertIs(config['servers'][0]._layout, config['servers'][1]._layout)  # Same keys, shared layout
+        self.assertEqual(yact.thaw(config._data), yact.from_file(filename)._data)
+        with self.assertRaises(yact.ConfigEditFailed):
+            config.set('db.host', 'elsewhere')
+        with self.assertRaises(yact.ConfigEditFailed):
+            config.remove('db')
+        with self.assertRaises(yact.ConfigEditFailed):
+            with config.batch():
+                pass
+        with open(filename, 'a') as f:
+            f.write('modified: True\n')
+        config.refresh()
+        self.assertTrue(config['modified'])
+
+    def test_schema(self):
+        filename = self.sample_cfg
+        schema = {'db': {'host': str, 'port': int, 'dbname': str, 'replicas': typing.Optional[list]},
+                  'environment': str}
+        config = yact.from_file(filename, schema=schema)
+        self.assertEqual(config.typed.db.port, 27017)
+        self.assertIsNone(config.typed.db.replicas)
+        config.set('db.port', '5433')  # Coerced to the declared type
+        self.assertEqual(config.typed.db.port, 5433)
+        with self.assertRaises(yact.ConfigEditFailed):
+            config.set('db.port', 'not a port')
+        self.assertEqual(config['db.port'], '5433')
+        with self.assertRaises(yact.ConfigEditFailed):
+            config.remove('db.host')
+        with open(filename, 'w') as f:
+            f.write('db: {host: h, port: nope, dbname: d}\nenvironment: prod\n')
+        with self.assertRaises(yact.InvalidConfigFile):
+            config.refresh()
+        self.assertEqual(config['environment'], 'development')  # Previous data kept
+        self.assertEqual(config.typed.db.port, 5433)
+        self.assertTrue(config.config_file_changed)  # Still seen as changed, so it is retried
+        with self.assertRaises(yact.SchemaError):
+            yact.compile_schema({'port': int})({'port': True})
+
+    def test_schema_dataclass(self):
+        @dataclasses.dataclass
+        class Db(object):
+            host: str
+            port: int
+            timeout: float = 1.5
+
+        @dataclasses.dataclass
+        class Settings(object):
+            db: Db
+            environment: str
+
+        config = yact.from_file(self.sample_cfg, schema=Settings, frozen=True)
+        self.assertIsInstance(config.typed, Settings)
+        self.assertEqual(config.typed.db, Db('localhost', 27017, 1.5))
+
+    def test_schema_dataclass_defaults(self):
+        @dataclasses.dataclass
+        class Settings(object):
+            environment: str
+            tags: list = dataclasses.field(default_factory=list)
+            options: dict = dataclasses.field(default_factory=dict)
+            transform: typing.Any = str.upper
+
+        config = yact.from_file(self.sample_cfg, schema=Settings, frozen=True)
+        self.assertEqual(config.typed.tags, [])
+        self.assertEqual(config.typed.options, {})
+        self.assertIs(config.typed.transform, str.upper)
+        validate = yact.compile_schema(Settings)
+        self.assertIsNot(validate({'environment': 'dev'}).tags, validate({'environment': 'dev'}).tags)
+
+    def test_overrides(self):
+        environ = {'APP_DB__HOST': 'db1.prod', 'APP_DB__PORT': '5432', 'APP_LOGGING__LEVEL': 'DEBUG', 'HOME': '/'}
+        args = yact.set_args(['run', '--set', 'db.port=5433', '--set=feature.enabled=true'])
+        overrides = yact.Overrides(env_prefix='APP', args=args, environ=environ)
+        config = yact.from_file(self.sample_cfg, overrides=overrides)
+        self.assertEqual(config['db.host'], 'db1.prod')
+        self.assertEqual(config['db.port'], 5433)  # Assignments win over the environment
+        self.assertEqual(config['db.dbname'], 'test')
+        self.assertIs(config['feature.enabled'], True)
+        self.assertEqual(config['logging.level'], 'DEBUG')
+        config.set('db.host', 'ignored')  # Still overridden
+        config.set('environment', 'production')
+        self.assertEqual(config['db.host'], 'db1.prod')
+        self.assertEqual(config['environment'], 'production')
+        saved = yact.from_file(config.filename)
+        self.assertEqual(saved['db.host'], 'ignored')  # Overrides are never saved
+        self.assertEqual(saved['db.port'], 27017)
+        self.assertNotIn('feature', saved.sections)
+        self.assertFalse(config.refresh_overrides())
+        environ['APP_DB__HOST'] = 'db2.prod'
+        self.assertTrue(config.refresh_overrides())
+        self.assertEqual(config['db.host'], 'db2.prod')
+        del environ['APP_DB__HOST']
+        config.refresh()
+        self.assertEqual(config['db.host'], 'ignored')
+        with self.assertRaises(ValueError):
+            yact.Overrides(args=['no-value'])
+
+    def test_overrides_changed_during_edit(self):
+        environ = {'APP_DB__HOST': 'db1.prod'}
+        config = yact.from_file(self.sample_cfg, autosave=False,
+                                overrides=yact.Overrides(env_prefix='APP', environ=environ))
+        self.assertEqual(config.find('db.host'), [('db.host', 'db1.prod')])
+        environ['APP_DB__HOST'] = 'db2.prod'
+        config.set('environment', 'production')  # Unrelated edit picks up the new environment
+        self.assertEqual(config['db.host'], 'db2.prod')
+        self.assertEqual(config.find('db.host'), [('db.host', 'db2.prod')])
+        self.assertIn(('db.host', 'db2.prod'), config.items('db'))
+
+    def test_metrics(self):
+        config = yact.from_file(self.sample_cfg, metrics=True)
+        config['db.host']
+        config['db.host']
+        config.set('db.host', 'elsewhere')
+        with open(config.filename, 'a') as f:
+            f.write('broken: [')
+        with self.assertRaises(yact.InvalidConfigFile):
+            config.refresh()
+        stats = config.stats()
+        self.assertEqual(stats['generation'], config.generation)
+        self.assertEqual(stats['counters'], {'reloads': 1, 'reload_failures': 1, 'lookup_hits': 1, 'lookup_misses': 1})
+        self.assertEqual(config.stats()['counters'], stats['counters'])  # Reading does not count as a lookup
+        for name in ['parse_seconds', 'hash_seconds', 'save_seconds', 'lock_wait_seconds', 'lock_hold_seconds']:
+            self.assertGreater(stats['histograms'][name]['count'], 0, name)
+        exporter = yact.PrometheusExporter()
+        exporter.register(config)
+        text = exporter.render()
+        self.assertIn('# TYPE yact_reloads_total counter', text)
+        self.assertIn('yact_parse_seconds_bucket{{file="{}",le="+Inf"}} 2'.format(config.filename), text)
+        self.assertNotIn('counters', yact.from_file(self.sample_cfg).stats())
+
+    def test_shared(self):
+        directory = tempfile.mkdtemp()
+        scheduler = yact.WatchScheduler()
+        try:
+            path = os.path.join(directory, 'app.yact')
+            config = yact.from_file(self.sample_cfg)
+            publisher = yact.share(config, path)
+            worker = yact.from_shared(path, frozen=True)
+            self.assertEqual(worker['db.host'], 'localhost')
+            self.assertEqual(worker.md5sum, config.md5sum)
+            self.assertFalse(worker.config_file_changed)
+            generation = worker.generation
+            worker.refresh()  # Unchanged generation, nothing loaded
+            self.assertEqual(worker.generation, generation)
+            worker.start_file_watch(0.05, scheduler)
+            config.set('db.host', 'elsewhere')
+            for _ in range(100):
+                if worker['db.host'] == 'elsewhere':
+                    break
+                sleep(0.05)
+            self.assertEqual(worker['db.host'], 'elsewhere')
+            with self.assertRaises(yact.ConfigEditFailed):
+                worker.set('db.host', 'local')
+
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            child = context.Process(target=lambda: queue.put(yact.from_shared(path)['db.host']))
+            child.start()
+            self.assertEqual(queue.get(timeout=10), 'elsewhere')
+            child.join(10)
+            publisher.close()
+            self.assertLessEqual(len(os.listdir(directory)), 3)  # Header and the last two generations
+        finally:
+            scheduler.shutdown(timeout=5)
+            shutil.rmtree(directory)
+
+    def test_shared_concurrent_publishers(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'app.yact')
+            errors = []
+
+            def publish():
+                snapshot = yact.shared.SharedSnapshot(path)
+                try:
+                    for i in range(20):
+                        snapshot.publish({'i': i})
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=publish) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+            self.assertEqual(errors, [])
+            self.assertEqual(yact.shared.SharedSnapshot(path).generation, 80)  # No generation handed out twice
+            self.assertFalse([name for name in os.listdir(directory) if name.endswith('.tmp')])
+
+            junk = os.path.join(directory, 'junk.yact')
+            with open(junk, 'wb') as f:
+                f.write(os.urandom(128))
+            with self.assertRaises(ValueError):
+                yact.shared.SharedSnapshot(junk).generation
+            with self.assertRaises(yact.InvalidConfigFile):
+                yact.from_shared(junk)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_fork_after_share(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'app.yact')
+            config = yact.from_file(self.sample_cfg, auto_reload=True)
+            publisher = yact.share(config, path)
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+
+            def child():
+                worker = yact.from_shared(path)
+                queue.put((publisher._subscription in config._subscriptions, config._file_watcher,
+                           publisher._lock.acquire(timeout=1), worker['db.host']))
+
+            with publisher._lock:  # Held by the parent while it forks
+                processes = [context.Process(target=child) for _ in range(3)]
+                for process in processes:
+                    process.start()
+            for _ in processes:
+                self.assertEqual(queue.get(timeout=10), (False, None, True, 'localhost'))
+            for process in processes:
+                process.join(10)
+            generation = publisher.snapshot.generation
+            config.set('db.host', 'elsewhere')
+            self.assertEqual(publisher.snapshot.generation, generation + 1)  # Published once, by the parent
+            publisher.close()
+            config.stop_file_watch()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_pickle(self):
+        sample = self.sample_cfg
+        config = yact.from_file(sample, metrics=True, interpolate=True)
+        config.subscribe('db.host', lambda *args: None)
+        copy = pickle.loads(pickle.dumps(config))
+        os.remove(sample)  # The copy never reads the file
+        self.assertEqual(copy['db.host'], 'localhost')
+        self.assertEqual(copy.md5sum, config.md5sum)
+        self.assertEqual(copy.items('db'), config.items('db'))
+        self.assertEqual(copy._subscriptions, ())
+        self.assertIsNot(copy.metrics, config.metrics)
+        self.assertIsNot(copy._lock, config._lock)
+
+    def test_pickle_lazy_and_frozen(self):
+        lazy = yact.from_file(self.sample_cfg, lazy=True)
+        lazy['logging']  # One section loaded, the others still pending
+        copy = pickle.loads(pickle.dumps(lazy))
+        self.assertEqual(copy.get('db.host'), 'localhost')
+        self.assertEqual(copy['logging'], lazy['logging'])
+        self.assertEqual(copy['db'], lazy['db'])
+        frozen = yact.from_file(self.sample_cfg, frozen=True)
+        copy = pickle.loads(pickle.dumps(frozen))
+        self.assertEqual(copy['db.host'], 'localhost')
+        self.assertEqual(copy['db'], frozen['db'])
+        with self.assertRaises(TypeError):
+            copy['db']['host'] = 'elsewhere'
+
+    def test_fork(self):
+        config = yact.from_file(self.sample_cfg, auto_reload=True, autosave=False)
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+
+        def child():
+            config.set('db.host', 'child')  # Would deadlock on the parent's lock
+            watcher = config._file_watcher  # A new scheduler, running in the child
+            queue.put((config['db.host'], watcher is yact.get_scheduler() and watcher.is_watching(config)))
+
+        with config._lock:  # Held by the parent while it forks
+            process = context.Process(target=child)
+            process.start()
+        self.assertEqual(queue.get(timeout=10), ('child', True))
+        process.join(10)
+        self.assertEqual(config['db.host'], 'localhost')
+        config.stop_file_watch()
+
+    def test_multi_document(self):
+        filename = self.sample_cfg
+        with open(filename, 'a') as f:
+            f.write('---\nname: second\n---\nname: third\n')
+        config = yact.from_file(filename, multi_document=True)
+        self.assertEqual(len(config.documents), 3)
+        self.assertEqual(config.documents[0]['db']['host'], 'localhost')
+        first = config.documents[0]
+        with open(filename, 'a') as f:
+            f.write('---\nname: fourth\n')
+        self.assertTrue(config.config_file_changed)
+        config.refresh()
+        self.assertTrue(config._stream.incremental)
+        self.assertIs(config.documents[0], first)  # Earlier documents were not parsed again
+        self.assertEqual([d['name'] for d in config.documents[1:]], ['second', 'third', 'fourth'])
+        with open(filename, 'rb') as f:
+            self.assertEqual(config.md5sum, hashlib.md5(f.read()).hexdigest())
+        with open(filename, 'r+') as f:  # Rewrite an earlier document in place
+            f.write('ab')
+        config.refresh()
+        self.assertFalse(config._stream.incremental)
+        self.assertIn('ab', config.documents[0])
+        with self.assertRaises(yact.ConfigEditFailed):
+            config.set('db.host', 'elsewhere')
+        config.save()
+        self.assertEqual(yact.from_file(filename, multi_document=True).documents, config.documents)
+
+    def test_multi_document_keys(self):
+        filename = self.sample_cfg
+        with open(filename, 'a') as f:
+            f.write('---\nname: second\nhosts: [a, b]\n')
+        config = yact.from_file(filename, multi_document=True)
+        self.assertEqual(config.sections, ['0', '1'])
+        self.assertEqual(config['0.db.host'], 'localhost')
+        self.assertEqual(config['1.hosts.1'], 'b')
+        self.assertEqual(config['1']['name'], 'second')
+        for key in ('db', '2', '1.hosts.2', '1.name.x'):
+            with self.assertRaises(KeyError):
+                config[key]
+        self.assertIsNone(config.get('db'))
+        self.assertEqual(config.get('2.name', 'missing'), 'missing')
+        self.assertEqual(config.get_many(['1.name', 'db.host'], 'missing'), {'1.name': 'second', 'db.host': 'missing'})
+        self.assertEqual(config.accessor('0.db.host')(), 'localhost')
+        self.assertEqual(config.find('*.name'), [('1.name', 'second')])
+        self.assertEqual(config.find('0.db.h*'), [('0.db.host', 'localhost')])
+        self.assertEqual(config.items('1'), [('1.hosts', ['a', 'b']), ('1.name', 'second')])
+        self.assertIn(('0.db.port', 27017), config.items())
+        self.assertEqual(config.accessor('db.host', 'missing')(), 'missing')
+
+    def test_write_behind(self):
+        directory = tempfile.mkdtemp()  # Saves land after the edits, keep them away from the shared sample file
+        filename = os.path.join(directory, 'sample.yaml')
+        shutil.copyfile(os.path.join(os.path.curdir, 'sample.yaml'), filename)
+        config = yact.from_file(filename, write_behind=0.2, write_behind_max_delay=1)
+        try:
+            saves = []
+            save = config.save
+            config.save = lambda: saves.append(save()) or True
+            for i in range(100):
+                config.set('flags.flag{}'.format(i % 10), i)
+            self.assertTrue(config.dirty)
+            self.assertEqual(saves, [])
+            self.assertEqual(config['flags.flag9'], 99)  # Visible before it is saved
+            for _ in range(60):
+                if saves:
+                    break
+                sleep(0.05)
+            self.assertEqual(saves, [True])  # The burst was coalesced into one save
+            self.assertFalse(config.dirty)
+            self.assertEqual(yact.from_file(config.filename)['flags.flag9'], 99)
+            config.set('flags.flag0', 'flushed')
+            self.assertTrue(config.flush())
+            self.assertFalse(config.flush())
+            self.assertEqual(yact.from_file(config.filename)['flags.flag0'], 'flushed')
+
+            saves[:] = []
+            for i in range(40):  # Edits never pause, so only the max delay lets a save through
+                config.set('flags.counter', i)
+                sleep(0.05)
+            self.assertGreaterEqual(len(saves), 1)
+        finally:
+            config.flush()
+            shutil.rmtree(directory)
+
     def test_save(self):
         config = yact.from_file(self.sample_cfg)
 
@@ -85,6 +758,75 @@ class test_yact(unittest.TestCase):
         new_config = yact.from_file(new_filename)
         self.assertEqual(config._data, new_config._data)
 
+    def test_atomic_save(self):
+        config = yact.from_file(self.sample_cfg)
+        os.chmod(config.filename, 0o640)
+        inode = os.stat(config.filename).st_ino
+        directory = os.listdir(os.path.dirname(os.path.abspath(config.filename)))
+        self.assertTrue(config.save())
+        self.assertNotEqual(os.stat(config.filename).st_ino, inode)  # Replaced, not rewritten in place
+        self.assertEqual(os.stat(config.filename).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(os.path.dirname(os.path.abspath(config.filename))), directory)
+        self.assertEqual(config.md5sum, yact.config.generate_md5sum(config.filename))
+
+    def test_atomic_write_new_file_umask(self):
+        directory = tempfile.mkdtemp()
+        previous = os.umask(0o027)
+        try:
+            filename = os.path.join(directory, 'new.yaml')
+            yact.config.atomic_write(filename, b'a: 1\n')
+            self.assertEqual(os.umask(0o027), 0o027)  # Writing leaves the umask alone
+            self.assertEqual(os.stat(filename).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(directory), ['new.yaml'])
+        finally:
+            os.umask(previous)
+            shutil.rmtree(directory)
+
+    def test_save_skip_unchanged(self):
+        config = yact.from_file(self.sample_cfg, skip_unchanged_saves=True)
+        config.save(skip_unchanged=False)  # Normalize the file to the dumper's output
+        inode = os.stat(config.filename).st_ino
+        self.assertFalse(config.save())
+        self.assertEqual(os.stat(config.filename).st_ino, inode)
+        config.set('thischanged', True)
+        self.assertNotEqual(os.stat(config.filename).st_ino, inode)
+
+    def test_snapshot_cache(self):
+        class CountingBackend(yact.YAMLBackend):
+            loads = 0
+
+            def load(self, raw, unsafe=False):
+                self.loads += 1
+                return super(CountingBackend, self).load(raw, unsafe)
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            backend = CountingBackend()
+            filename = self.sample_cfg
+            config = yact.from_file(filename, backend=backend, snapshot_cache=cache_dir)
+            self.assertEqual(backend.loads, 1)
+            cached = yact.from_file(filename, backend=backend, snapshot_cache=cache_dir)
+            self.assertEqual(backend.loads, 1)  # Served from the cache
+            self.assertEqual(cached._data, config._data)
+            self.assertEqual(cached.md5sum, config.md5sum)
+            with open(filename, 'a') as f:
+                f.write('modified: True')
+            changed = yact.from_file(filename, backend=backend, snapshot_cache=cache_dir)
+            self.assertEqual(backend.loads, 2)
+            self.assertTrue(changed['modified'])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_snapshot_cache_eviction(self):
+        cache = yact.SnapshotCache(tempfile.mkdtemp(), max_entries=2)
+        try:
+            signature = yact.watch.file_signature(self.sample_cfg)
+            for name in ('a.yaml', 'b.yaml', 'c.yaml'):
+                cache.put(name, signature, 'md5', {'name': name})
+            self.assertEqual(len(os.listdir(cache.directory)), 2)
+        finally:
+            shutil.rmtree(cache.directory)
+
     def test_refresh(self):
         config = yact.from_file(self.sample_cfg)
         loaded = config.ts_refreshed_utc
@@ -100,6 +842,61 @@ class test_yact(unittest.TestCase):
     def test_unsafe_load(self):
         config = yact.from_file(self.sample_cfg, unsafe=True)
 
+    def test_default_backend(self):
+        config = yact.from_file(self.sample_cfg)
+        self.assertIsInstance(config.backend, yact.YAMLBackend)
+        self.assertEqual(config.backend.libyaml, yaml.__with_libyaml__)
+        pure = yact.from_file(self.sample_cfg, backend=yact.YAMLBackend(use_libyaml=False))
+        self.assertEqual(pure._data, config._data)
+
+    def test_save_ordered_dict(self):
+        filename = self.sample_cfg
+        config = yact.from_file(filename)
+        config.set('ordered', collections.OrderedDict([('b', 1), ('a', 2)]))
+        self.assertTrue(config.save())
+        reloaded = yact.from_file(filename, unsafe=True)
+        self.assertEqual(reloaded['ordered'], collections.OrderedDict([('b', 1), ('a', 2)]))
+
+    def test_custom_backend(self):
+        class UpperBackend(yact.YAMLBackend):
+            name = 'upper-test'
+
+            def load(self, raw, unsafe=False):
+                data = super(UpperBackend, self).load(raw, unsafe)
+                return {key.upper(): value for key, value in data.items()}
+
+        yact.register_backend(UpperBackend())
+        config = yact.from_file(self.sample_cfg, backend='upper-test')
+        self.assertEqual(config['ENVIRONMENT'], 'development')
+        with self.assertRaises(ValueError):
+            yact.from_file(self.sample_cfg, backend='no-such-backend')
+
+    def test_format_backends(self):
+        directory = tempfile.mkdtemp()
+        try:
+            data = yact.from_file(self.sample_cfg)._data
+            path = os.path.join(directory, 'app.json')
+            with open(path, 'wb') as f:
+                f.write(yact.JSONBackend().dump(data))
+            config = yact.from_file(path)
+            self.assertIsInstance(config.backend, yact.JSONBackend)
+            self.assertEqual(config._data, data)
+            config.set('db.port', 5433)
+            self.assertEqual(yact.from_file(path, backend='json')['db.port'], 5433)
+            os.rename(path, os.path.join(directory, 'app.conf'))  # Unknown extension, sniffed
+            self.assertIsInstance(yact.from_file('app.conf', directory).backend, yact.JSONBackend)
+            path = os.path.join(directory, 'app.toml')
+            with open(path, 'w') as f:
+                f.write('[db]\nhost = "localhost"\nport = 27017\n')
+            self.assertEqual(yact.from_file(path)['db.port'], 27017)
+            self.assertIsInstance(yact.sniff(b'# comment\n[db]\nhost = "x"\n'), yact.TOMLBackend)
+            self.assertIsInstance(yact.sniff(b'db:\n  host: x\n'), yact.YAMLBackend)
+            self.assertIsInstance(yact.sniff(b'\x81\xa2db\xc0'), yact.MsgpackBackend)
+            self.assertIsInstance(yact.backend_for('app.yml'), yact.YAMLBackend)
+            self.assertIsInstance(yact.backend_for('app.msgpack'), yact.MsgpackBackend)
+        finally:
+            shutil.rmtree(directory)
+
     def test_sections(self):
         config = yact.from_file(self.sample_cfg)
         self.assertIsInstance(config.sections, list)
@@ -133,12 +930,127 @@ class test_yact(unittest.TestCase):
             f.write('modified: True')
         self.assertTrue(config.config_file_changed)
 
+    def test_config_file_unchanged(self):
+        config = yact.from_file(self.sample_cfg)
+        self.assertFalse(config.config_file_changed)
+        config.set('thischanged', True)  # Our own save must not look like an external change
+        self.assertFalse(config.config_file_changed)
+        os.utime(config.filename, None)  # Signature moves, contents do not
+        self.assertFalse(config.config_file_changed)
+
+    @unittest.skipUnless(yact.watch.inotify_available, 'inotify not available')
+    def test_inotify(self):
+        config = yact.from_file(self.sample_cfg)
+        notifier = yact.watch.Inotify()
+        try:
+            notifier.add_watch(config.filename)
+            with open(config.filename, 'a') as f:
+                f.write('modified: True')
+            self.assertIn(os.path.abspath(config.filename), notifier.wait(1))
+        finally:
+            notifier.close()
+
+    def test_shared_watch_scheduler(self):
+        scheduler = yact.WatchScheduler()
+        try:
+            configs = [yact.from_file(self.sample_cfg) for _ in range(10)]
+            threads = threading.active_count()
+            for config in configs:
+                config.start_file_watch(interval=1, scheduler=scheduler)
+            self.assertLessEqual(threading.active_count(), threads + 1)
+            self.assertEqual(len(scheduler), 10)
+            self.assertTrue(configs[0].start_file_watch(scheduler=scheduler))  # Already watched
+            configs[0].stop_file_watch()
+            self.assertFalse(scheduler.is_watching(configs[0]))
+            self.assertEqual(len(scheduler), 9)
+        finally:
+            scheduler.shutdown(timeout=5)
+        self.assertEqual(len(scheduler), 0)
+
+    def test_watch_skips_config_in_batch(self):
+        directory = tempfile.mkdtemp()
+        scheduler = yact.WatchScheduler(use_inotify=False)
+        try:
+            configs = []
+            for name in ('busy.yaml', 'idle.yaml'):
+                filename = os.path.join(directory, name)
+                shutil.copyfile(os.path.join(os.path.curdir, 'sample.yaml'), filename)
+                configs.append(yact.from_file(filename, autosave=False))
+            busy, idle = configs
+            for config in configs:
+                config.start_file_watch(interval=0.05, scheduler=scheduler)
+            with busy.batch():
+                for config in configs:
+                    with open(config.filename, 'a') as f:
+                        f.write('appended: true\n')
+                for _ in range(100):
+                    if idle.get('appended'):
+                        break
+                    sleep(0.05)
+                self.assertTrue(idle.get('appended'))  # Not stuck behind the batch
+                self.assertIsNone(busy.get('appended'))
+            for _ in range(100):
+                if busy.get('appended'):
+                    break
+                sleep(0.05)
+            self.assertTrue(busy.get('appended'))  # Checked again once the batch released the lock
+        finally:
+            scheduler.shutdown(timeout=5)
+            shutil.rmtree(directory)
+
+    def test_watch_backoff(self):
+        scheduler = yact.WatchScheduler(use_inotify=False)
+        try:
+            config = yact.from_file(self.sample_cfg)
+            config.start_file_watch(interval=0.05, scheduler=scheduler)
+            with open(config.filename, 'a') as f:
+                f.write('broken: [')
+            sleep(0.5)
+            self.assertGreater(scheduler._watches[id(config)].failures, 0)
+            self.assertEqual(config['db.host'], 'localhost')  # Previous data kept
+        finally:
+            scheduler.shutdown(timeout=5)
+
+    def test_async_config(self):
+        async def scenario():
+            config = await yact.async_from_file(self.sample_cfg)
+            self.assertIsInstance(config, yact.AsyncConfig)
+            self.assertEqual(config['db.host'], 'localhost')
+            changes = config.changes()
+            pending = asyncio.ensure_future(changes.__anext__())
+            await asyncio.sleep(0)
+            await config.set('db.host', 'elsewhere')
+            change = await asyncio.wait_for(pending, 5)
+            self.assertEqual(change.generation, config.generation)
+            self.assertEqual(config.get('db.host'), 'elsewhere')
+            await changes.aclose()
+
+        asyncio.run(scenario())
+
+    def test_async_autoreload(self):
+        async def scenario():
+            config = await yact.async_from_file(self.sample_cfg, auto_reload=True)
+            changes = config.changes()
+            pending = asyncio.ensure_future(changes.__anext__())
+            await asyncio.sleep(0.1)
+            with open(config.config.filename, 'a') as f:
+                f.write('modified: True')
+            await asyncio.wait_for(pending, 10)
+            self.assertTrue(config['modified'])
+            await config.stop_file_watch()
+            await changes.aclose()
+
+        asyncio.run(scenario())
+
     def test_autoreload(self):
         config = yact.from_file(self.sample_cfg, auto_reload=True)
         oldmd5 = config.md5sum
         with open(config.filename, 'a') as f:
             f.write('modified: True')
-        sleep(6)
+        for _ in range(120):  # Up to 6s; inotify usually makes it immediate
+            if config.md5sum != oldmd5:
+                break
+            sleep(0.05)
         # By now yact should have refreshed, let's verify
         self.assertNotEqual(oldmd5, config.md5sum)
 
@@ -1,4 +1,18 @@
-from .config import Config, from_file, ConfigEditFailed, MissingConfig, InvalidConfigFile
+from .config import Config, Accessor, from_file, ConfigEditFailed, MissingConfig, InvalidConfigFile
+from .backends import (Backend, YAMLBackend, JSONBackend, TOMLBackend, MsgpackBackend, register_backend,
+                       get_backend, backend_for, sniff)
+from .cache import SnapshotCache
+from .frozen import FrozenMapping, freeze, thaw
+from .schema import SchemaError, compile_schema
+from .interpolation import InterpolationError
+from .overrides import Overrides, set_args
+from .metrics import Metrics, PrometheusExporter
+from .watch import WatchScheduler, get_scheduler, shutdown_scheduler
+from .aio import AsyncConfig, async_from_file
+from .layered import LayeredConfig
+from .loading import from_files, load_directory
+from .shared import SharedConfig, share, from_shared
+from .writeback import flush_all
 
 __author__ = 'Jesse Roberts'
 __email__ = 'jesse@hackedpotatoes.com'
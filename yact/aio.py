@@ -0,0 +1,188 @@
+"""
+Asyncio front end for `Config`.
+
+Blocking work (searching for and parsing files, saving) runs in an
+executor so the event loop is never stalled by a reload. Lookups are
+served straight from the wrapped config's lock-free snapshots.
+
+::
+
+    >>> config = await yact.async_from_file('app.yaml', auto_reload=True)
+    >>> config['db.host']
+    'localhost'
+    >>> async for change in config.changes():
+    ...     reconnect(config['db.host'])
+"""
+import os
+import asyncio
+import logging
+from functools import partial
+from datetime import datetime
+from collections import namedtuple
+
+from .config import from_file
+from .watch import Inotify, inotify_available
+
+logger = logging.getLogger(__name__)
+
+Change = namedtuple('Change', ['config', 'generation', 'ts'])
+
+
+async def async_from_file(filename, directory=None, auto_reload=False, executor=None, **kwargs):
+    """
+    Awaitable version of `yact.from_file`, returning an `AsyncConfig`.
+    With `auto_reload` the file is watched by an asyncio task instead
+    of the shared watcher thread.
+    """
+    loop = asyncio.get_running_loop()
+    config = await loop.run_in_executor(executor, partial(from_file, filename, directory=directory, **kwargs))
+    aconfig = AsyncConfig(config, executor=executor)
+    if auto_reload:
+        aconfig.start_file_watch()
+    return aconfig
+
+
+class AsyncConfig(object):
+    """
+    Wrap a `Config` for use from coroutines. Reads are synchronous
+    (they never block); `refresh`, `save`, `set` and `remove` are
+    coroutines that run the blocking work in `executor`.
+    """
+
+    def __init__(self, config, executor=None):
+        self.config = config
+        self._executor = executor
+        self._watch_task = None
+        self._queues = set()
+        self._generation = config.generation
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.config.filename)
+
+    def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def _notify(self):
+        """
+        Push a `Change` to every `changes()` consumer if new data was published
+        """
+        generation = self.config.generation
+        if generation == self._generation:
+            return
+        self._generation = generation
+        change = Change(self, generation, datetime.now())
+        for queue in self._queues:
+            queue.put_nowait(change)
+
+    async def refresh(self):
+        await self._run(self.config.refresh)
+        self._notify()
+
+    async def save(self, skip_unchanged=None):
+        return await self._run(self.config.save, skip_unchanged)
+
+    async def set(self, key, value):
+        await self._run(self.config.set, key, value)
+        self._notify()
+
+    async def remove(self, key):
+        await self._run(self.config.remove, key)
+        self._notify()
+
+    def get(self, key, default=None):
+        return self.config.get(key, default)
+
+    def accessor(self, key, *args):
+        return self.config.accessor(key, *args)
+
+    @property
+    def sections(self):
+        return self.config.sections
+
+    @property
+    def generation(self):
+        return self.config.generation
+
+    def __getitem__(self, item):
+        return self.config[item]
+
+    async def changes(self):
+        """
+        Async iterator of `Change` events, one per reload or edit:
+
+        ::
+
+            >>> async for change in config.changes():
+            ...     print(change.generation)
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        self._queues.add(queue)
+        # Also hear about reloads and edits made through the wrapped config directly
+        subscription = self.config.subscribe(None, lambda key, old, new: loop.call_soon_threadsafe(self._notify))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.config.unsubscribe(subscription)
+            self._queues.discard(queue)
+
+    def start_file_watch(self, interval=5):
+        """
+        Watch the config file from an asyncio task on the running loop.
+        On Linux, inotify events wake the task immediately.
+        """
+        if self._watch_task is not None and not self._watch_task.done():
+            return True
+        self._watch_task = asyncio.get_running_loop().create_task(self._watch(interval))
+
+    async def stop_file_watch(self):
+        task, self._watch_task = self._watch_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _watch(self, interval):
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        notifier = None
+        if inotify_available:
+            try:
+                notifier = Inotify()
+                notifier.add_watch(self.config.filename)
+                loop.add_reader(notifier.fileno(), self._on_inotify, notifier, wakeup)
+            except (OSError, NotImplementedError) as e:  # Some event loops cannot watch file descriptors
+                logger.debug('inotify unavailable for {}, polling instead: {}'.format(self.config.filename, e))
+                if notifier is not None:
+                    notifier.close()
+                notifier = None
+        failures = 0
+        try:
+            while True:
+                delay = interval
+                wakeup.clear()  # Before checking, so events arriving during the check are kept
+                try:
+                    if await self._run(lambda: self.config.config_file_changed):
+                        await self.refresh()
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    delay = min(interval * 2 ** failures, 300)
+                    logger.warning('Failed to reload {}: {}'.format(self.config.filename, e))
+                self._notify()  # Also report changes published through the wrapped config directly
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if notifier is not None:
+                loop.remove_reader(notifier.fileno())
+                notifier.close()
+
+    def _on_inotify(self, notifier, wakeup):
+        if os.path.abspath(self.config.filename) in notifier.read():
+            wakeup.set()
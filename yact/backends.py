@@ -0,0 +1,247 @@
+"""
+Serialization backends used by `Config` to parse and write config files.
+
+A backend turns raw file bytes into Python data and back. YAML is the
+default; it uses PyYAML's libyaml bindings (`CSafeLoader`/`CDumper`)
+whenever PyYAML was built with them. Other parsers can be plugged in
+with `register_backend` and selected with `Config(..., backend='name')`.
+
+JSON, TOML and msgpack backends are registered as well. When no backend
+is given, `Config` picks one from the file extension (`backend_for`),
+or for unknown extensions by sniffing the start of the file (`sniff`).
+TOML needs `tomllib` (Python 3.11+) or `tomli` to read and `tomli_w`
+to write; msgpack needs the `msgpack` package.
+"""
+import re
+import json
+
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Backend(object):
+    """
+    Base class for config serialization backends
+    """
+    name = None
+    extensions = ()  # File extensions handled by default, e.g. ('.json',)
+
+    def load(self, raw, unsafe=False):
+        """
+        Parse raw bytes into Python data
+        """
+        raise NotImplementedError
+
+    def dump(self, data, unsafe=False):
+        """
+        Serialize Python data to bytes
+        """
+        raise NotImplementedError
+
+    def load_all(self, raw, unsafe=False):
+        """
+        Parse raw bytes holding several documents, yielding each
+        """
+        raise NotImplementedError('{} does not support multi-document files'.format(self))
+
+    def dump_all(self, documents, unsafe=False):
+        """
+        Serialize several documents to bytes
+        """
+        raise NotImplementedError('{} does not support multi-document files'.format(self))
+
+    def __repr__(self):
+        return "{}()".format(self.__class__.__name__)
+
+
+class YAMLBackend(Backend):
+    """
+    PyYAML backend. Uses the libyaml C implementation when available
+    unless `use_libyaml` is False. Dumps with PyYAML's full `Dumper`, as
+    `yaml.dump` does, so values such as an `OrderedDict` can be saved.
+    """
+    name = 'yaml'
+    extensions = ('.yaml', '.yml')
+
+    def __init__(self, use_libyaml=True):
+        libyaml = use_libyaml and getattr(yaml, '__with_libyaml__', False)
+        if libyaml:
+            self.safe_loader = yaml.CSafeLoader
+            self.unsafe_loader = getattr(yaml, 'CUnsafeLoader', yaml.CLoader)
+            self.dumper = yaml.CDumper
+        else:
+            self.safe_loader = yaml.SafeLoader
+            self.unsafe_loader = getattr(yaml, 'UnsafeLoader', yaml.Loader)
+            self.dumper = yaml.Dumper
+        self.libyaml = bool(libyaml)
+
+    def load(self, raw, unsafe=False):
+        return yaml.load(raw, Loader=self.unsafe_loader if unsafe else self.safe_loader)
+
+    def dump(self, data, unsafe=False):
+        return yaml.dump(data, Dumper=self.dumper, default_flow_style=False, encoding='utf-8')
+
+    def load_all(self, raw, unsafe=False):
+        return yaml.load_all(raw, Loader=self.unsafe_loader if unsafe else self.safe_loader)
+
+    def dump_all(self, documents, unsafe=False):
+        return yaml.dump_all(documents, Dumper=self.dumper, default_flow_style=False, explicit_start=True,
+                             encoding='utf-8')
+
+    def __repr__(self):
+        return "{}(use_libyaml={})".format(self.__class__.__name__, self.libyaml)
+
+
+class JSONBackend(Backend):
+    """
+    JSON backend. Loads with orjson when it is installed (unless
+    `use_orjson` is False), otherwise with the standard library's
+    C accelerated `json` module. `unsafe` has no effect.
+    """
+    name = 'json'
+    extensions = ('.json',)
+
+    def __init__(self, use_orjson=True, indent=2):
+        self.orjson = bool(use_orjson and orjson is not None)
+        self.indent = indent
+
+    def load(self, raw, unsafe=False):
+        if self.orjson:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    def dump(self, data, unsafe=False):
+        return (json.dumps(data, indent=self.indent, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def __repr__(self):
+        return "{}(use_orjson={})".format(self.__class__.__name__, self.orjson)
+
+
+class TOMLBackend(Backend):
+    """
+    TOML backend. Reads with `tomllib` (or `tomli`), writes with `tomli_w`.
+    """
+    name = 'toml'
+    extensions = ('.toml',)
+
+    def load(self, raw, unsafe=False):
+        try:
+            import tomllib
+        except ImportError:  # Before Python 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError('Reading TOML requires Python 3.11+ or the tomli package')
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        return tomllib.loads(raw)
+
+    def dump(self, data, unsafe=False):
+        try:
+            import tomli_w
+        except ImportError:
+            raise ImportError('Writing TOML requires the tomli_w package')
+        return tomli_w.dumps(data).encode('utf-8')
+
+
+class MsgpackBackend(Backend):
+    """
+    msgpack backend, for machine generated configs
+    """
+    name = 'msgpack'
+    extensions = ('.msgpack', '.mpk')
+
+    def _msgpack(self):
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError('The msgpack backend requires the msgpack package')
+        return msgpack
+
+    def load(self, raw, unsafe=False):
+        return self._msgpack().unpackb(raw, raw=False, strict_map_key=False)
+
+    def dump(self, data, unsafe=False):
+        return self._msgpack().packb(data, use_bin_type=True)
+
+
+_backends = {}
+_extensions = {}
+
+_JSON_START = re.compile(br'^\{\s*("[^"\n]*"\s*:|\})')
+_TOML_LINE = re.compile(br'^\s*(\[\[?[\w.\-" ]+\]\]?|[\w.\-"]+\s*=)')
+
+
+def register_backend(backend, name=None, extensions=None):
+    """
+    Make backend available by name, e.g. `Config(..., backend=name)`.
+    Registering an existing name replaces the previous backend.
+
+    The backend also becomes the default for `extensions`, replacing
+    whichever backend had them. Without `extensions`, the backend's own
+    `extensions` are claimed if no other backend has them yet.
+    """
+    _backends[name or backend.name] = backend
+    if extensions is None:
+        extensions = [e for e in getattr(backend, 'extensions', ()) if e.lower() not in _extensions]
+    for extension in extensions:
+        _extensions[extension.lower()] = backend
+    return backend
+
+
+def sniff(raw):
+    """
+    Guess the backend for raw file contents: msgpack maps by their
+    leading byte, JSON documents by their braces and TOML by a table
+    header or `key =` on the first significant line. Anything else
+    is treated as YAML. Only the start of the file is needed.
+    """
+    if not raw:
+        return _backends['yaml']
+    first = raw[0]
+    if 0x80 <= first <= 0x8f or first in (0xde, 0xdf):  # fixmap, map16, map32
+        return _backends['msgpack']
+    text = raw.lstrip()
+    if _JSON_START.match(text):
+        return _backends['json']
+    for line in text.splitlines():
+        if line.strip() and not line.lstrip().startswith(b'#'):
+            if _TOML_LINE.match(line):
+                return _backends['toml']
+            break
+    return _backends['yaml']
+
+
+def backend_for(filename):
+    """
+    The backend registered for filename's extension, or None
+    """
+    if not filename:
+        return None
+    extension = filename[filename.rfind('.'):].lower() if '.' in filename else ''
+    return _extensions.get(extension)
+
+
+def get_backend(backend=None):
+    """
+    Resolve a backend name (or instance) to a backend instance.
+    None returns the default YAML backend.
+    """
+    if backend is None:
+        backend = 'yaml'
+    if hasattr(backend, 'load') and hasattr(backend, 'dump'):
+        return backend
+    try:
+        return _backends[backend]
+    except KeyError:
+        raise ValueError('Unknown config backend {!r}, expected one of {}'.format(backend, sorted(_backends)))
+
+
+register_backend(YAMLBackend())
+register_backend(JSONBackend())
+register_backend(TOMLBackend())
+register_backend(MsgpackBackend())
@@ -0,0 +1,155 @@
+"""
+On-disk cache of parsed config data.
+
+Parsing a large YAML file dominates cold start. `SnapshotCache` stores
+the parsed tree as a pickle keyed by the source's path, stat signature
+and content hash, so an unchanged file loads without being parsed (and,
+when its stat signature can be trusted, without being read at all).
+
+Entries are pickles: only point the cache at a directory you own.
+"""
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+from time import time
+
+from .watch import RACY_WINDOW_NS, FileSignature
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'yact')
+
+
+def get_snapshot_cache(cache):
+    """
+    Resolve the `snapshot_cache` argument of `Config`: None/False
+    disables caching, True uses the default directory, a string
+    names a cache directory, anything else is used as is.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return SnapshotCache()
+    if isinstance(cache, str):
+        return SnapshotCache(cache)
+    return cache
+
+
+class SnapshotCache(object):
+    """
+    Directory of parsed config snapshots, evicted least recently used
+    first once it holds more than `max_entries` files or `max_bytes`.
+    """
+
+    def __init__(self, directory=None, max_entries=256, max_bytes=256 * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.directory)
+
+    def _entry_path(self, filename, variant):
+        key = '{}\0{}'.format(os.path.realpath(filename), variant).encode('utf-8', 'surrogateescape')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest() + '.pickle')
+
+    def get(self, filename, signature, md5sum=None, variant=''):
+        """
+        Return `(data, md5sum)` for filename, or None on a miss.
+
+        Without `md5sum` the entry is only used if its stat signature
+        matches and is old enough to be trusted. With `md5sum` (the hash
+        of the current file contents) a matching hash is enough.
+        """
+        if signature is None:
+            return None
+        path = self._entry_path(filename, variant)
+        try:
+            with open(path, 'rb') as f:
+                header = pickle.load(f)
+                if header.get('version') != CACHE_VERSION or header.get('variant') != variant:
+                    return None
+                if md5sum is None:
+                    cached = FileSignature(*header['signature'])
+                    if cached != signature or signature.mtime_ns >= header['created_ns'] - RACY_WINDOW_NS:
+                        return None
+                elif md5sum != header['md5sum']:
+                    return None
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError, AttributeError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.debug('Ignoring unreadable snapshot cache entry {}: {}'.format(path, e))
+            return None
+        try:
+            os.utime(path, None)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return data, header['md5sum']
+
+    def put(self, filename, signature, md5sum, data, variant=''):
+        """
+        Store parsed data for filename. Failures are logged, never raised.
+        """
+        if signature is None:
+            return
+        header = {
+            'version': CACHE_VERSION,
+            'variant': variant,
+            'path': os.path.realpath(filename),
+            'signature': tuple(signature),
+            'md5sum': md5sum,
+            'created_ns': int(time() * 1e9),
+        }
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, 0o700)
+            fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._entry_path(filename, variant))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            logger.debug('Unable to cache snapshot of {}: {}'.format(filename, e))
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache is within its limits
+        """
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pickle'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        entries.sort(reverse=True)  # Most recently used first
+        total = 0
+        for index, (_, size, path) in enumerate(entries):
+            total += size
+            if index >= self.max_entries or total > self.max_bytes:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pickle'):
+                    os.unlink(entry.path)
+        except OSError:
+            pass
@@ -1,14 +1,47 @@
 import os
 import sys
-import yaml
-import hashlib
+import stat
 import logging
-from time import sleep
-from threading import Lock, Thread
+import weakref
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from collections import namedtuple
+from threading import Lock, RLock
 from datetime import datetime, timedelta
 
+from .backends import backend_for, get_backend, sniff
+from .cache import get_snapshot_cache
+from .diff import diff, lookup, match_changes
+from .frozen import freeze, thaw
+from .index import KeyIndex
+from .interpolation import InterpolationError, interpolate, update as update_references
+from .lazy import Deferred, lazy_load, materialize, resolve
+from .metrics import get_metrics
+from .overrides import apply
+from .schema import SchemaError, compile_schema
+from .stream import DocumentStream
+from .writeback import DEFAULT_DEBOUNCE, get_flusher
+from .watch import ChangeDetector, file_signature, get_scheduler, md5_bytes
+
 logger = logging.getLogger(__name__)
 
+# Every live config, so their locks and watches can be recreated in a forked child
+_configs = weakref.WeakSet()
+
+_MISSING = object()
+
+# A published, immutable view of the config data. `lookups` caches
+# resolved dotted keys and dies with the snapshot it belongs to; `typed`
+# is the schema-checked view of data, when the config has a schema.
+# `source` is data without overrides applied (the same object if there
+# are none); edits are made to it and it is what gets saved. `index`
+# is the flattened key index used by `find` and `items`, built on demand.
+# `references` holds the `${...}` templates found in source, if the
+# config interpolates (source keeps them; data holds their results).
+_Snapshot = namedtuple('_Snapshot', ['data', 'generation', 'lookups', 'typed', 'source', 'index', 'references'])
+
+Subscription = namedtuple('Subscription', ['key', 'pattern', 'callback'])
+
 
 class InvalidConfigFile(Exception):
     """Raised when config cannot be parsed/opened"""
@@ -29,12 +62,109 @@ class ConfigEditFailed(Exception):
 
 
 def generate_md5sum(filename, encoding='utf-8'):
-    with open(filename, 'r') as f:
-        md5 = hashlib.md5(f.read().encode(encoding))
-    return md5.hexdigest()
+    """
+    Hash the raw bytes of filename. `encoding` is kept for
+    backwards compatibility; the file is no longer decoded.
+    """
+    with open(filename, 'rb') as f:
+        return md5_bytes(f.read())
+
+
+@lru_cache(maxsize=1024)
+def split_key(key):
+    """
+    Split a dotted key into its path components.
+    Results are cached, since the same keys are looked up repeatedly.
+    """
+    return tuple(key.split('.'))
+
+
+def _position(data, name):
+    """
+    Look up a key segment in a list (the documents of a `multi_document`
+    config, or a list value) by position. Raises KeyError for anything
+    that is neither a mapping nor a list, or for a position out of range.
+    """
+    if isinstance(data, (list, tuple)) and name.isdigit() and int(name) < len(data):
+        return data[int(name)]
+    raise KeyError(name)
+
+
+def _walk(data, path):
+    """
+    Follow the segments of a split key down data: mappings by key, lists
+    by position (see `_position`), parsing deferred values on the way.
+    Raises KeyError when a segment is missing.
+    """
+    for name in path:
+        try:
+            data = data[name]
+        except TypeError:  # Not a mapping
+            data = _position(data, name)
+        if data.__class__ is Deferred:
+            data = data.value
+    return data
+
+
+def atomic_write(filename, raw):
+    """
+    Replace filename with raw bytes so readers only ever see the old or
+    the new contents. The data is written to a temporary file in the same
+    directory, fsync'ed and renamed over the original. Existing permissions
+    are kept and symlinks are followed.
+    """
+    filename = os.path.realpath(filename)
+    directory, basename = os.path.split(filename)
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        mode = None  # A new file gets the default mode, less the umask
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmp = os.path.join(directory, '.{}.{}.tmp'.format(basename, os.urandom(6).hex()))
+        try:
+            fd = os.open(tmp, flags, 0o666)  # The kernel applies the umask, as for open()
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if mode is not None:
+                os.chmod(tmp, mode)
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    try:  # Persist the rename itself
+        dirfd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform
+    try:
+        os.fsync(dirfd)
+    except OSError:
+        pass
+    finally:
+        os.close(dirfd)
 
 
-def from_file(filename, directory=None, unsafe=False, auto_reload=False, create_if_missing=False):
+def search_prefixes(directory=None):
+    """
+    Directories searched for config files, in order
+    """
+    prefixes = ['/etc', os.path.expanduser('~/.config'), os.path.abspath(os.path.curdir),
+                os.path.abspath(os.path.pardir)]
+    if directory:
+        prefixes.insert(0, directory)
+    return prefixes
+
+
+def from_file(filename, directory=None, unsafe=False, auto_reload=False, create_if_missing=False, **kwargs):
     """
     Convenience function to search for a config file and
     return a `Config` object. Searches some default
@@ -48,10 +178,10 @@ def from_file(filename, directory=None, unsafe=False, auto_reload=False, create_
     config file will be created relative to your current
     directory unless `directory` is passed, in which case
     the file will be created there.
+
+    Any other keyword arguments are passed on to `Config`.
     """
-    prefixes = ['/etc', '~/.config', os.path.abspath(os.path.curdir), os.path.abspath(os.path.pardir)]
-    if directory:
-        prefixes.insert(0, directory)
+    prefixes = search_prefixes(directory)
     if os.path.isfile(filename):
         logger.debug('Retrieving config from full path {}'.format(filename))
         path = filename
@@ -66,7 +196,10 @@ def from_file(filename, directory=None, unsafe=False, auto_reload=False, create_
         else:
             if not create_if_missing:
                 raise MissingConfig('{} does not exist'.format(filename))
-    config = Config(filename=path, unsafe=unsafe, auto_reload=auto_reload)
+            path = os.path.join(directory or os.path.curdir, filename)
+            logger.debug('Creating empty config {}'.format(path))
+            open(path, 'a').close()
+    config = Config(filename=path, unsafe=unsafe, auto_reload=auto_reload, **kwargs)
     config.refresh()
     return config
 
@@ -80,48 +213,524 @@ class Config(object):
 
     While not currently tested, unsafe loading of YAML
     files is supported using the unsafe flag.
+
+    Parsing and writing go through a pluggable backend
+    (see `yact.backends`). Unless `backend` is given it is
+    picked from the file extension (`.json`, `.toml`,
+    `.msgpack`, ...), or by sniffing the file's contents
+    for other extensions, falling back to YAML. The YAML
+    backend uses libyaml's C loader and dumper when PyYAML
+    has them.
+    Pass `snapshot_cache` to keep parsed data on disk
+    between runs (see `yact.cache.SnapshotCache`).
+
+    With `lazy=True` only the top-level keys of a YAML file
+    are indexed on load; each top-level section is parsed
+    the first time it is read (see `yact.lazy`). `set` and
+    `remove` parse only the section they modify, while `save`
+    parses every remaining section before writing the file.
+
+    With `frozen=True` loaded data is converted to a compact
+    immutable tree (see `yact.frozen`): mappings become
+    `FrozenMapping` objects and lists become tuples. Frozen
+    configs reject `set`, `remove` and `batch`, but still
+    reload when the file changes.
+
+    Pass `schema` (a dataclass, TypedDict or dict spec, see
+    `yact.schema`) to validate and coerce data whenever it is
+    loaded or edited. The result is available as `typed`.
+    A reload that does not match the schema raises
+    `InvalidConfigFile` and the previous data stays in place;
+    an edit that breaks it raises `ConfigEditFailed`.
+
+    Pass `overrides` (a `yact.overrides.Overrides`) to lay
+    environment variables and `--set` style assignments over
+    the file's values. They are applied once per refresh or
+    edit and never written back by `save`.
+
+    With `interpolate=True`, `${db.host}` and `${env:HOME}`
+    references in string values are resolved whenever the config
+    loads, in dependency order (see `yact.interpolation`).
+    Lookups return the results; `save` writes the references.
+    After `set`/`remove` only the values depending on the edited
+    key are resolved again.
+
+    With `multi_document=True` the file is read as a stream of
+    `---` separated YAML documents, available as `documents`.
+    When the file only grew, reloads parse just the documents
+    appended since the last load (see `yact.stream`). Keys start
+    with the document's position (`config['0.db.host']`). Such
+    configs cannot be edited with `set`/`remove`.
+
+    With `write_behind` (True, or a debounce in seconds),
+    `set` and `remove` do not save. A background thread saves
+    once edits pause for the debounce, and at most
+    `write_behind_max_delay` seconds after the first unsaved
+    edit (see `yact.writeback`). `flush` saves immediately.
+
+    Pass `metrics=True` to record parse, hash and save times,
+    writer lock wait and hold times, lookup cache hits and
+    reload counts, available through `stats()` (see
+    `yact.metrics`).
+
+    Loaded data is treated as an immutable snapshot. Writers
+    (`refresh`, `set`, `remove`) build a new tree off to the
+    side, copying only the mappings along the modified path,
+    and publish it with a single reference swap. Readers never
+    block, and always see either the old or the new snapshot.
+    Values returned from lookups belong to the snapshot and
+    must not be mutated in place.
+
+    Configs can be pickled (to send to `multiprocessing` or
+    `ProcessPoolExecutor` workers): the loaded data travels
+    with them, so the receiving process does not read the file.
+    Locks, subscriptions and metrics are not sent, and a config
+    with `auto_reload=True` starts watching its file again once
+    unpickled. In a child created with `os.fork` every config
+    gets fresh locks and watches its file again if it did in
+    the parent.
     """
 
-    def __init__(self, filename, unsafe=False, auto_reload=False):
+    def __init__(self, filename, unsafe=False, auto_reload=False, lookup_cache_size=1024, backend=None,
+                 autosave=True, skip_unchanged_saves=False, snapshot_cache=None, lazy=False, frozen=False,
+                 schema=None, overrides=None, metrics=False, multi_document=False, write_behind=False,
+                 write_behind_max_delay=5, interpolate=False):
+        if lazy and frozen:
+            raise ValueError('A config cannot be both lazy and frozen')
+        if multi_document and (lazy or overrides is not None):
+            raise ValueError('Multi-document configs do not support lazy loading or overrides')
+        if interpolate and (lazy or multi_document):
+            raise ValueError('Interpolation is not supported for lazy or multi-document configs')
         self.unsafe = unsafe
+        self.lazy = lazy
+        self.frozen = frozen
+        self.schema = schema
+        self.overrides = overrides
+        self.metrics = get_metrics(metrics)
+        self.multi_document = multi_document
+        self.interpolate = interpolate
+        self._stream = None
+        self.write_behind = DEFAULT_DEBOUNCE if write_behind is True else (write_behind or None)
+        self.write_behind_max_delay = write_behind_max_delay
+        self._dirty = False  # Edits published but not saved yet (write-behind only)
+        self._validate = None if schema is None else compile_schema(schema)
+        self.snapshot_cache = get_snapshot_cache(snapshot_cache)
+        self.autosave = autosave
+        self.skip_unchanged_saves = skip_unchanged_saves
+        self._backend = get_backend(backend) if backend is not None else backend_for(filename)
         self.auto_reload = auto_reload
+        self.lookup_cache_size = lookup_cache_size
         self._file_watcher = None
+        self._detector = ChangeDetector()
         self.filename = filename
         self.md5sum = None
-        self._lock = Lock()
+        self._snapshot = _Snapshot({}, 0, {}, None, {}, KeyIndex({}), None)
+        self._lock = RLock()  # Serializes writers only; readers never take it
+        self._batch_depth = 0
+        self._subscriptions = ()  # Replaced, never mutated, so dispatch can iterate without a lock
+        self._subscription_lock = Lock()
         self.ts_refreshed = None
         self.ts_refreshed_utc = None
+        _configs.add(self)
 
-    def start_file_watch(self, interval=5):
-        if self._file_watcher and self._file_watcher.is_alive():
-            return True  # No need to create a new watcher
+    @property
+    def backend(self):
+        """
+        The backend parsing and writing this config's file
+        """
+        backend = self._backend
+        if backend is None:  # Unknown extension, look at the contents once
+            try:
+                with open(self.filename, 'rb') as f:
+                    head = f.read(4096)
+            except (OSError, TypeError):
+                head = b''
+            backend = self._backend = sniff(head)
+        return backend
 
-        def watcher(config, interval):
-            while True:
-                if config.config_file_changed:
-                    config.refresh()
-                sleep(interval)
+    @backend.setter
+    def backend(self, backend):
+        self._backend = get_backend(backend)
 
-        self._file_watcher = Thread(target=watcher, args=(self, interval))
-        self._file_watcher.setDaemon(True)
-        self._file_watcher.start()
+    def start_file_watch(self, interval=5, scheduler=None):
+        """
+        Reload the config whenever the file changes. The file is checked
+        every `interval` seconds; on Linux, inotify events trigger an
+        immediate check. All configs share a single watcher thread
+        (see `yact.watch.WatchScheduler`) unless `scheduler` is given.
+        """
+        if self._file_watcher is not None and self._file_watcher.is_watching(self):
+            return True  # No need to create a new watcher
+        self._file_watcher = scheduler if scheduler is not None else get_scheduler()
+        self._file_watcher.watch(self, interval)
+
+    def stop_file_watch(self):
+        """
+        Stop watching the config file for changes
+        """
+        watcher, self._file_watcher = self._file_watcher, None
+        if watcher is not None:
+            watcher.unwatch(self)
 
     def refresh(self):
-        with self._lock:
+        with self._writing():
             try:
-                self.md5sum = generate_md5sum(self.filename)
-                with open(self.filename, 'r') as f:
-                    if not self.unsafe:
-                        self._data = yaml.safe_load(f)
-                    else:
-                        self._data = yaml.load(f)
-                    self.ts_refreshed = datetime.now()
-                    self.ts_refreshed_utc = datetime.utcnow()
+                signature = file_signature(self.filename)  # Taken before reading, so later writes always move it
+                data, md5sum = self._load(signature)
+                self._install(data, md5sum, signature)
+                self._discard_pending()
             except Exception as e:  # TODO: Split out into handling file IO and parsing errors
+                self._count('reload_failures')
                 raise InvalidConfigFile('{} failed to load: {}'.format(self.filename, e))
+            self._count('reloads')
         if self.auto_reload is True:
             self.start_file_watch()
 
+    def _discard_pending(self):
+        if self._dirty:
+            logger.warning('{} was reloaded with unsaved write-behind edits; they were discarded'.format(self))
+            self._dirty = False
+            get_flusher().cancel(self)
+
+    def _install(self, data, md5sum, signature):
+        """
+        Publish freshly loaded data along with the file state it came from
+        """
+        if data is None:
+            data = {}  # Empty file
+        source = data = freeze(data) if self.frozen else data
+        if self.overrides is not None:
+            data = self._overlay(source)
+            if self.frozen:
+                data = freeze(data)
+        data, references, _ = self._interpolate(data)
+        typed = self._check(data)  # Before anything is recorded, so a rejected file is retried
+        self.md5sum = md5sum
+        self._detector.record(signature)
+        self._publish(data, typed, source, references=references)
+        self.ts_refreshed = datetime.now()
+        self.ts_refreshed_utc = datetime.utcnow()
+
+    def _load(self, signature):
+        """
+        Read and parse the config file, going through the snapshot
+        cache when one is configured. Returns `(data, md5sum)`.
+        """
+        if self.multi_document:  # The document stream is its own cache
+            with open(self.filename, 'rb') as f:
+                raw = f.read()
+            if self._stream is None or self._stream.backend is not self.backend:
+                self._stream = DocumentStream(self.backend, self.unsafe)
+            with self._timed('parse'):
+                return self._stream.load(raw, signature.inode if signature else None)
+        if self.lazy:  # Caching would pickle the whole source text, nothing to gain
+            with open(self.filename, 'rb') as f:
+                raw = f.read()
+            with self._timed('hash'):
+                md5sum = md5_bytes(raw)
+            with self._timed('parse'):
+                return lazy_load(raw, self.backend, self.unsafe), md5sum
+        cache = self.snapshot_cache
+        variant = '{}:{}'.format(getattr(self.backend, 'name', None) or type(self.backend).__name__, self.unsafe)
+        if cache is not None:
+            cached = cache.get(self.filename, signature, variant=variant)
+            if cached is not None:
+                return cached  # Trusted stat signature, file not even read
+        with open(self.filename, 'rb') as f:
+            raw = f.read()
+        with self._timed('hash'):
+            md5sum = md5_bytes(raw)
+        if cache is not None:
+            cached = cache.get(self.filename, signature, md5sum, variant)
+            if cached is not None:
+                cache.put(self.filename, signature, md5sum, cached[0], variant)  # Record the new signature
+                return cached
+        with self._timed('parse'):
+            data = self.backend.load(raw, unsafe=self.unsafe)
+        if cache is not None:
+            cache.put(self.filename, signature, md5sum, data, variant)
+        return data, md5sum
+
+    @property
+    def _data(self):
+        return self._snapshot.data
+
+    def _timed(self, name):
+        return nullcontext() if self.metrics is None else self.metrics.time(name)
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+    def _locked(self):
+        """
+        The writer lock, timed when metrics are enabled
+        """
+        return self._lock if self.metrics is None else self.metrics.locked(self._lock)
+
+    def stats(self):
+        """
+        Snapshot of the config's state and, with metrics
+        enabled, its counters and histograms
+        """
+        stats = {
+            'generation': self.generation,
+            'md5sum': self.md5sum,
+            'ts_refreshed': self.ts_refreshed,
+            'lookup_cache_entries': len(self._snapshot.lookups),
+        }
+        if self.metrics is not None:
+            stats.update(self.metrics.snapshot())
+        return stats
+
+    @property
+    def documents(self):
+        """
+        The documents of a `multi_document` config (a single
+        document config is returned as a one item list)
+        """
+        return self._data if self.multi_document else [self._data]
+
+    @property
+    def generation(self):
+        """
+        Counter bumped every time new data is published
+        by `refresh`, `set` or `remove`.
+        """
+        return self._snapshot.generation
+
+    @property
+    def typed(self):
+        """
+        Schema-checked view of the data (None without a schema):
+
+        ::
+
+            >>> config.typed.db.port
+            5432
+        """
+        return self._snapshot.typed
+
+    def _check(self, data):
+        """
+        Run data through the schema, raising `SchemaError` if it does not match
+        """
+        return None if self._validate is None else self._validate(data)
+
+    def _overlay(self, source):
+        """
+        Apply the config's overrides to source
+        """
+        return source if self.overrides is None else apply(source, self.overrides.resolve())
+
+    def _interpolate(self, data, changed=None):
+        """
+        Resolve references in data (already overlaid). With `changed`,
+        data only differs from the current snapshot's data at that
+        path, and only the references it affects are resolved again.
+        Callers pass None when the overrides moved as well (see
+        `_edited`), and everything is resolved again.
+        Returns `(data, references, paths of re-resolved values)`.
+        """
+        if not self.interpolate:
+            return data, None, ()
+        previous = self._snapshot
+        if changed is None or previous.references is None:
+            data, references = interpolate(data)
+            touched = ()
+        else:
+            data, references, touched = update_references(previous.references, previous.data, data, changed)
+        return (freeze(data) if self.frozen else data), references, touched
+
+    def _edited(self, path):
+        """
+        The `changed` path for `_publish` after an edit at path. Overrides
+        re-read from a changed environment may move other keys too, so
+        this must be called before `_overlay` resolves them again.
+        """
+        return None if self.overrides is not None and self.overrides.changed else path
+
+    def refresh_overrides(self):
+        """
+        Re-apply overrides without reloading the file, if the environment
+        changed since they were last applied. Returns whether it did.
+        """
+        if self.overrides is None or not self.overrides.changed:
+            return False
+        with self._writing():
+            source = self._snapshot.source
+            data = self._overlay(source)
+            self._publish(freeze(data) if self.frozen else data, source=source)
+        return True
+
+    def _publish(self, data, typed=_MISSING, source=_MISSING, changed=None, references=_MISSING):
+        """
+        Swap in a new snapshot. Must be called from within `_writing`.
+        `source` is data before overrides and references are resolved,
+        and defaults to data. `changed` is the only path at which
+        source differs from the current snapshot's, if known; the key
+        index (and resolved references) are then derived from the
+        current snapshot's. Pass `references` for data that has been
+        resolved already.
+        """
+        touched = ()
+        if references is _MISSING:
+            data, references, touched = self._interpolate(data, changed)
+        if typed is _MISSING:
+            typed = self._check(data)
+        if source is _MISSING:
+            source = data
+        previous = self._snapshot
+        if changed is None:
+            index = KeyIndex(data)
+        else:
+            index = KeyIndex(data, previous.index, (changed,) + touched)
+        self._snapshot = _Snapshot(data, previous.generation + 1, {}, typed, source, index, references)
+
+    @contextmanager
+    def _writing(self):
+        """
+        Hold the writer lock for the block. Once it is released, notify
+        subscribers about whatever the block published (deferred until
+        the end of the outermost `batch`).
+        """
+        with self._locked():
+            before = self._snapshot
+            yield
+            after = self._snapshot
+            notify = not self._batch_depth
+        if notify and after is not before and self._subscriptions:
+            self._notify(before.data, after.data)
+
+    def _notify(self, old, new):
+        changed = list(diff(old, new))
+        if not changed:
+            return
+        for subscription in self._subscriptions:
+            if subscription.pattern is None:
+                changes = [(None, old, new)]
+            else:
+                changes = []
+                for path in match_changes(subscription.pattern, changed, old, new):
+                    old_value, new_value = lookup(old, path), lookup(new, path)
+                    if old_value is not new_value and next(diff(old_value, new_value), None) is not None:
+                        changes.append(('.'.join(str(name) for name in path), old_value, new_value))
+            for key, old_value, new_value in changes:
+                try:
+                    subscription.callback(key, old_value, new_value)
+                except Exception:
+                    logger.exception('Config subscriber {!r} failed for {}'.format(subscription.callback, key))
+
+    def subscribe(self, key, callback):
+        """
+        Call `callback(key, old, new)` whenever the value under a dotted
+        key changes, through a reload or an edit. Segments may contain
+        shell-style wildcards (`'db.*.host'`), in which case the callback
+        receives the concrete key that changed. With `key=None` the
+        callback fires once per change with the old and new data trees.
+
+        Changes are found by diffing snapshots; subtrees that did not
+        change are skipped without being walked. Callbacks run after
+        the writer lock is released. Missing values are passed as None.
+        Returns a `Subscription` for `unsubscribe`.
+        """
+        subscription = Subscription(key, None if key is None else split_key(key), callback)
+        with self._subscription_lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._subscription_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def accessor(self, key, default=_MISSING):
+        """
+        Return a callable bound to `key` for use in hot loops.
+        The value is resolved once per published snapshot:
+
+        ::
+
+            >>> db_host = config.accessor('db.host')
+            >>> db_host()
+            'localhost'
+
+        Missing keys raise `KeyError` unless a default is given.
+        """
+        return Accessor(self, key, default)
+
+    @contextmanager
+    def batch(self):
+        """
+        Group several `set`/`remove` calls into one save:
+
+        ::
+
+            >>> with config.batch():
+            ...     config.set('db.host', 'db1')
+            ...     config.set('db.port', 5432)
+
+        The file is written once when the outermost batch exits. If
+        the block raises, every change made inside it is rolled back
+        and nothing is written. Other writers (including reloads) wait
+        for the batch to finish; readers are never blocked. The file
+        watcher does not wait: it checks the file again shortly after.
+        Subscribers are notified once, after the batch.
+        """
+        self._check_writable()
+        with self._writing():
+            snapshot = self._snapshot
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._snapshot is not snapshot:
+                    self._publish(snapshot.data, snapshot.typed, snapshot.source, references=snapshot.references)
+                raise
+            finally:
+                self._batch_depth -= 1
+            if not self._batch_depth and self.autosave and self._snapshot is not snapshot:
+                self._save_changes()
+
+    transaction = batch
+
+    def _check_writable(self):
+        if self.frozen:
+            raise ConfigEditFailed('{} is frozen'.format(self))
+
+    def _written(self):
+        """
+        Called by `set`/`remove` after publishing a change, still under
+        the writer lock. Returns whether they should save once the lock
+        is released; inside a `batch` the batch saves when it exits.
+        Deciding under the lock means a batch entered by another thread
+        right after the edit cannot swallow its save.
+        """
+        return self.autosave and not self._batch_depth
+
+    def _save_changes(self):
+        if self.write_behind is None:
+            self.save()
+        else:
+            self._dirty = True
+            get_flusher().schedule(self)
+
+    @property
+    def dirty(self):
+        """
+        Whether write-behind edits are waiting to be saved
+        """
+        return self._dirty
+
+    def flush(self):
+        """
+        Save pending write-behind edits now. Returns whether anything was written.
+        """
+        get_flusher().cancel(self)
+        with self._lock:
+            if not self._dirty:
+                return False
+            return self.save()
+
     def get(self, key, default=None):
         """
         Retrieve the value of a key (or consecutive keys joined by periods)
@@ -132,6 +741,50 @@ class Config(object):
         except KeyError:
             return default
 
+    def get_many(self, keys, default=None):
+        """
+        Return `{key: value}` for several keys, all read from the same
+        snapshot. Missing keys map to default.
+        """
+        snapshot = self._snapshot
+        lookups = snapshot.lookups
+        values = {}
+        for key in keys:
+            data = lookups.get(key, _MISSING)
+            if data is _MISSING:
+                try:
+                    data = _walk(snapshot.data, split_key(key))
+                except KeyError:
+                    values[key] = default
+                    continue
+                if len(lookups) < self.lookup_cache_size:
+                    lookups[key] = data
+            values[key] = data
+        return values
+
+    def find(self, pattern):
+        """
+        Return sorted `(key, value)` pairs for the dotted keys matching
+        pattern, whose segments may contain shell-style wildcards:
+
+        ::
+
+            >>> config.find('db.*.host')
+            [('db.primary.host', 'db1'), ('db.replica.host', 'db2')]
+
+        Backed by the flattened key index (see `yact.index`), which
+        is built on first use; in `lazy` mode that parses everything.
+        """
+        return self._snapshot.index.find(pattern)
+
+    def items(self, prefix=None):
+        """
+        Return sorted `(key, value)` pairs for every leaf value (anything
+        but a non-empty mapping) below the dotted key prefix, or in the
+        whole config. Found by bisecting the flattened key index.
+        """
+        return self._snapshot.index.items(prefix)
+
     def set(self, key, value):
         """
         Set the value of a provided key (or nested keys joined by periods)
@@ -143,52 +796,140 @@ class Config(object):
         """
         Remove an item from configuration file
 
-        Establishes lock on configuration data, deletes config
-        entry matching the passed in key. Saves updated configuration
-        back to file.
+        Establishes the writer lock, publishes a new snapshot without
+        the config entry matching the passed in key. Saves updated
+        configuration back to file unless autosave is off or a
+        `batch` is in progress.
         """
-        with self._lock:
-            namespace = key.split('.')
-            data = self._data
-            for name in namespace[:-1]:
+        self._check_writable()
+        with self._writing():
+            namespace = split_key(key)
+            data = self._snapshot.source
+            for name in namespace:
                 try:
-                    data = data[name]
+                    data = resolve(data[name])
                 except KeyError:
                     return  # Item already gone, no need to do anything
+            root = parent = self._snapshot.source.copy()
+            for name in namespace[:-1]:
+                parent[name] = resolve(parent[name]).copy()
+                parent = parent[name]
+            parent.pop(namespace[-1])
             try:
-                data.pop(namespace[-1])
-            except KeyError:
-                return  # Same as above
-        self.save()
+                changed = self._edited(namespace)  # Before _overlay re-reads the environment
+                self._publish(self._overlay(root), source=root, changed=changed)
+            except (SchemaError, InterpolationError) as e:
+                raise ConfigEditFailed('Unable to remove {}: {}'.format(key, e))
+            save = self._written()
+        if save:
+            self._save_changes()
 
     @property
     def config_file_changed(self):
-        return self.md5sum != generate_md5sum(self.filename)
+        """
+        Cheap check for changes on disk: compares the file's stat
+        signature first and only hashes the contents when it moved.
+        """
+        return self._detector.changed(self.filename, self.md5sum)
 
     @property
     def sections(self):
         """
         Provided for users of the standard ConfigParser module.
+        For a `multi_document` config, the document positions.
         """
-        with self._lock:
-            return list(self._data.keys())
+        data = self._data
+        if self.multi_document:
+            return [str(i) for i in range(len(data))]
+        return list(data.keys())
 
-    def save(self):
+    def save(self, skip_unchanged=None):
         """
         Save current configuration back to file in YAML format
+        (or whichever format the config's backend writes)
+
+        Acquires configuration lock, serializes the data once in memory
+        and hashes those bytes, then atomically replaces the file (see
+        `atomic_write`). Readers of the file never see a partial write.
+        The YAML backend sets default_flow_style to false to force proper
+        YAML formatting
 
-        Acquires configuration lock, opens file in overwrite mode ('w')
-        and writes the output of yaml.dump to the file object.
-        default_flow_style is set to false to force proper YAML formatting
+        With `skip_unchanged` (defaults to the config's `skip_unchanged_saves`)
+        nothing is written when the serialized bytes match the file on disk.
+        Returns whether the file was written.
         """
-        with self._lock:
-            with open(self.filename, 'w') as f:
-                yaml.dump(self._data, f, default_flow_style=False)
-            self.md5sum = generate_md5sum(self.filename)
+        if skip_unchanged is None:
+            skip_unchanged = self.skip_unchanged_saves
+        with self._locked(), self._timed('save'):
+            source = self._snapshot.source  # Overrides are never saved
+            data = thaw(source) if self.frozen else materialize(source)
+            if self.multi_document:
+                raw = self.backend.dump_all(data, unsafe=self.unsafe)
+            else:
+                raw = self.backend.dump(data, unsafe=self.unsafe)
+            with self._timed('hash'):
+                md5sum = md5_bytes(raw)
+            if skip_unchanged and md5sum == self.md5sum and not self.config_file_changed:
+                self._dirty = False
+                return False
+            atomic_write(self.filename, raw)
+            self._dirty = False  # Pending edits are all in the snapshot just written
+            self.md5sum = md5sum
+            self._detector.record(file_signature(self.filename))
+            return True
 
     def __repr__(self):
         return "{}({})".format(self.__class__.__name__, self.filename)
 
+    # Per-process state: recreated by __setstate__ and _after_fork
+    _LOCAL_STATE = ('_lock', '_subscription_lock', '_subscriptions', '_file_watcher', '_validate', '_stream',
+                    '_batch_depth')
+
+    def __getstate__(self):
+        """
+        Pickle the published data and file state, not the
+        locks, watcher, subscriptions or caches
+        """
+        with self._lock:
+            state = {k: v for k, v in self.__dict__.items() if k not in self._LOCAL_STATE}
+            snapshot = self._snapshot
+        state['_snapshot'] = snapshot._replace(lookups={}, index=None)
+        state['metrics'] = self.metrics is not None
+        state['_dirty'] = False  # Pending write-behind edits are saved by this process
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        snapshot = self._snapshot
+        self._snapshot = snapshot._replace(index=KeyIndex(snapshot.data))
+        self.metrics = get_metrics(self.metrics)
+        self._validate = None if self.schema is None else compile_schema(self.schema)
+        self._stream = None
+        self._file_watcher = None
+        self._lock = RLock()
+        self._batch_depth = 0
+        self._subscriptions = ()
+        self._subscription_lock = Lock()
+        _configs.add(self)
+        if self.auto_reload is True:
+            self.start_file_watch()
+
+    def _after_fork(self):
+        """
+        Called in a forked child: the parent's threads are gone and
+        its locks may have been held at the time of the fork
+        """
+        self._lock = RLock()
+        self._subscription_lock = Lock()
+        self._batch_depth = 0
+        self._dirty = False  # Left to the parent to save
+        if self.metrics is not None:
+            self.metrics._lock = Lock()
+        watcher, self._file_watcher = self._file_watcher, None
+        watch = None if watcher is None else watcher._watches.get(id(self))
+        if watch is not None and watch.config() is self:
+            self.start_file_watch(watch.interval)
+
     def __getitem__(self, item):
         """
         Allow `Config` to behave as a dictionary.
@@ -201,12 +942,18 @@ class Config(object):
             >>> print(config['db.host'])
             'localhost'
         """
-        with self._lock:
-            namespace = item.split('.')
-            data = self._data
-            for name in namespace:
-                data = data[name]  # Allow keyerrors to bubble up
+        snapshot = self._snapshot  # Published snapshots are never mutated, no lock needed
+        data = snapshot.lookups.get(item, _MISSING)
+        if data is not _MISSING:
+            if self.metrics is not None:
+                next(self.metrics.lookup_hits)
             return data
+        if self.metrics is not None:
+            next(self.metrics.lookup_misses)
+        data = _walk(snapshot.data, split_key(item))  # Allow keyerrors to bubble up
+        if len(snapshot.lookups) < self.lookup_cache_size:
+            snapshot.lookups[item] = data
+        return data
 
     def __setitem__(self, key, value):
         """
@@ -223,15 +970,70 @@ class Config(object):
             >>> config['db.port'] = 21707
             {'db': {'host': 'localhost', 'port': 21707}}
         """
-        with self._lock:
-            namespace = key.split('.')
-            data = self._data
+        self._check_writable()
+        with self._writing():
+            namespace = split_key(key)
+            source = self._snapshot.source
+            if not hasattr(source, 'get'):
+                raise ConfigEditFailed("Unable to set {}: {} is not a mapping".format(key, source))
+            root = data = source.copy()
             for name in namespace[:-1]:
-                if hasattr(data, 'get') and hasattr(data.get(name, {}), 'get'):
-                    if data.get(name) is None:
-                        data[name] = {}
-                else:
+                child = resolve(data.get(name, {}))
+                if not hasattr(child, 'get'):
                     raise ConfigEditFailed("Unable to set {}: {} is an invalid child of {}".format(key, name, data))
-                data = data[name]
+                data[name] = child = child.copy()  # Copy on write, leave the published snapshot untouched
+                data = child
             data[namespace[-1]] = value
-        self.save()
+            try:
+                changed = self._edited(namespace)  # Before _overlay re-reads the environment
+                self._publish(self._overlay(root), source=root, changed=changed)
+            except (SchemaError, InterpolationError) as e:
+                raise ConfigEditFailed('Unable to set {}: {}'.format(key, e))
+            save = self._written()
+        if save:
+            self._save_changes()
+
+
+class Accessor(object):
+    """
+    Cheap callable bound to a single dotted key of a `Config`.
+    Created through `Config.accessor`. The key is split once and
+    the resolved value is reused until the config publishes new data.
+    """
+    __slots__ = ('config', 'key', '_path', '_default', '_cached')
+
+    def __init__(self, config, key, default=_MISSING):
+        self.config = config
+        self.key = key
+        self._path = split_key(key)
+        self._default = default
+        self._cached = (None, None)  # (generation, value), swapped as one
+
+    def __call__(self):
+        snapshot = self.config._snapshot
+        generation, value = self._cached
+        if generation == snapshot.generation:
+            return value
+        try:
+            value = _walk(snapshot.data, self._path)
+        except KeyError:
+            if self._default is _MISSING:
+                raise
+            value = self._default
+        self._cached = (snapshot.generation, value)
+        return value
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(self.__class__.__name__, self.config, self.key)
+
+
+def _after_fork_in_child():
+    for config in list(_configs):
+        try:
+            config._after_fork()
+        except Exception:
+            logger.exception('Failed to reset {} after fork'.format(config))
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,105 @@
+"""
+Structural diffs between config snapshots.
+
+Snapshots published by `set`/`remove` share every untouched subtree
+with their predecessor, so those are skipped by identity. Freshly
+parsed trees are compared subtree by subtree with the C-level `==`,
+only descending into mappings that actually differ.
+"""
+from fnmatch import fnmatchcase
+from collections.abc import Mapping
+
+from .lazy import Deferred, resolve
+
+_MISSING = object()
+_WILDCARDS = frozenset('*?[')
+
+
+def diff(old, new, path=()):
+    """
+    Yield the paths (tuples of keys) at which old and new differ.
+    Added or removed keys are reported at the key itself, changed
+    values at the deepest mapping key that still differs.
+    """
+    if old is new:
+        return
+    if old.__class__ is Deferred or new.__class__ is Deferred:
+        if old.__class__ is new.__class__ and old.loader is new.loader and old.source == new.source:
+            return  # Same text, no need to parse either side
+        old, new = resolve(old), resolve(new)
+    if not (isinstance(old, Mapping) and isinstance(new, Mapping)):
+        if old != new or type(old) is not type(new):
+            yield path
+        return
+    if old == new:
+        return
+    for key, value in old.items():
+        other = new.get(key, _MISSING)
+        if other is _MISSING:
+            yield path + (key,)
+        elif other is not value:
+            for changed in diff(value, other, path + (key,)):
+                yield changed
+    for key in new:
+        if key not in old:
+            yield path + (key,)
+
+
+def lookup(data, path, default=None):
+    """
+    Resolve a path tuple in data, returning default if any part is missing
+    """
+    for name in path:
+        if not isinstance(data, Mapping):
+            return default
+        data = data.get(name, _MISSING)
+        if data is _MISSING:
+            return default
+    return resolve(data)
+
+
+def _segment_matches(pattern, name):
+    if pattern == name:
+        return True
+    return isinstance(name, str) and bool(_WILDCARDS.intersection(pattern)) and fnmatchcase(name, pattern)
+
+
+def _expand(pattern, old, new, prefix):
+    """
+    Concrete paths below prefix matching the remaining pattern segments,
+    taking keys from both the old and new subtrees
+    """
+    if not pattern:
+        yield prefix
+        return
+    segment, rest = pattern[0], pattern[1:]
+    if not _WILDCARDS.intersection(segment):
+        names = [segment]
+    else:
+        names = []
+        for node in (old, new):
+            if isinstance(node, Mapping):
+                names.extend(name for name in node if name not in names and _segment_matches(segment, name))
+    for name in names:
+        for path in _expand(rest, lookup(old, (name,)), lookup(new, (name,)), prefix + (name,)):
+            yield path
+
+
+def match_changes(pattern, changed, old, new):
+    """
+    Map changed paths onto a subscription pattern (a tuple of key
+    segments, which may contain shell-style wildcards). Returns the
+    concrete paths, of the pattern's length, whose values may have
+    changed, in the order they were found.
+    """
+    matches = {}
+    size = len(pattern)
+    for path in changed:
+        if not all(_segment_matches(p, name) for p, name in zip(pattern, path)):
+            continue
+        if len(path) >= size:
+            matches[tuple(path[:size])] = None
+        else:  # An ancestor of the subscribed key was replaced
+            for match in _expand(pattern[len(path):], lookup(old, path), lookup(new, path), tuple(path)):
+                matches[match] = None
+    return list(matches)
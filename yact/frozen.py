@@ -0,0 +1,92 @@
+"""
+Compact, immutable representation of config data.
+
+`freeze` converts a loaded tree so that every mapping becomes a
+`FrozenMapping`: a tuple of values plus a key -> index layout that is
+shared by every mapping with the same keys (lists of records usually
+have identical keys). Keys are interned, repeated string values are
+deduplicated and lists become tuples. Nothing in the tree can be
+modified, which also keeps refcount-only traffic away from most pages
+after a fork.
+"""
+import sys
+from collections.abc import Mapping
+
+
+class FrozenMapping(Mapping):
+    """
+    Read-only mapping storing its values in a tuple, indexed
+    through a layout shared with same-shaped mappings
+    """
+    __slots__ = ('_layout', '_values')
+
+    def __init__(self, layout, values):
+        self._layout = layout
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._layout[key]]
+
+    def get(self, key, default=None):
+        index = self._layout.get(key)
+        return default if index is None else self._values[index]
+
+    def __contains__(self, key):
+        return key in self._layout
+
+    def __iter__(self):
+        return iter(self._layout)
+
+    def __len__(self):
+        return len(self._values)
+
+    def keys(self):
+        return self._layout.keys()
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenMapping) and other._layout is self._layout:
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (FrozenMapping, (self._layout, self._values))
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, dict(self.items()))
+
+
+def freeze(data, _layouts=None, _strings=None):
+    """
+    Return an immutable, compact copy of data
+    """
+    if _layouts is None:
+        _layouts, _strings = {}, {}
+    if data.__class__ is FrozenMapping:
+        return data  # Already frozen
+    if isinstance(data, Mapping):
+        keys = tuple(sys.intern(key) if type(key) is str else key for key in data)
+        layout = _layouts.get(keys)
+        if layout is None:
+            layout = _layouts[keys] = {key: index for index, key in enumerate(keys)}
+        return FrozenMapping(layout, tuple(freeze(value, _layouts, _strings) for value in data.values()))
+    if isinstance(data, (list, tuple)):
+        return tuple(freeze(value, _layouts, _strings) for value in data)
+    if type(data) is str:
+        return _strings.setdefault(data, data)
+    return data
+
+
+def thaw(data):
+    """
+    Convert a frozen tree back to plain dicts and lists
+    """
+    if isinstance(data, FrozenMapping):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, tuple):
+        return [thaw(value) for value in data]
+    return data
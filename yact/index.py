@@ -0,0 +1,162 @@
+"""
+Flattened dotted-key index of a config snapshot.
+
+`KeyIndex` maps the dotted key of every node in a tree (`'db'`,
+`'db.primary'`, `'db.primary.host'`, ...) to its value and keeps the
+keys in a sorted list. Everything below a prefix is then one contiguous
+slice, found with two bisections instead of walking the tree, and
+glob patterns only scan the slice below their literal prefix.
+
+The documents of a multi-document config are indexed by position
+(`'0.db.host'`), matching how they are looked up.
+
+An index is built the first time a snapshot is queried. Snapshots
+published by `set`/`remove` derive theirs from the previous snapshot's
+index, re-flattening only the edited subtrees.
+"""
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from .diff import _WILDCARDS, _segment_matches, lookup
+from .lazy import resolve
+
+_MISSING = object()
+
+# Edits collected before an index is rebuilt from scratch instead
+_MAX_CHANGES = 64
+
+
+def flatten(data, prefix='', into=None):
+    """
+    Return `{dotted key: value}` for every node below data
+    """
+    if into is None:
+        into = {}
+    for name, value in data.items():
+        key = '{}{}'.format(prefix, name)
+        into[key] = value = resolve(value)
+        if isinstance(value, Mapping) and value:
+            flatten(value, key + '.', into)
+    return into
+
+
+def _span(keys, key):
+    """
+    Start and end of the entries strictly below key in the sorted keys
+    """
+    return bisect_left(keys, key + '.'), bisect_left(keys, key + '/')  # '/' sorts right after '.'
+
+
+class KeyIndex(object):
+    """
+    Lazily built index of data. `base` is the index of the snapshot
+    data was derived from, and `changed` the paths edited since.
+    """
+    __slots__ = ('data', '_base', '_changed', '_built')
+
+    def __init__(self, data, base=None, changed=()):
+        if base is not None and base._built is None:  # Not built either: inherit what it was derived from
+            changed = base._changed + tuple(changed)
+            base = base._base
+        if base is None or len(changed) > _MAX_CHANGES:
+            base, changed = None, ()
+        self.data = data
+        self._base = base
+        self._changed = tuple(changed)
+        self._built = None  # (sorted keys, values)
+
+    def _build(self):
+        built = self._built
+        if built is not None:
+            return built
+        base, changed = self._base, self._changed  # Another reader may be building it too
+        if base is None:
+            data = self.data
+            if isinstance(data, (list, tuple)):  # The documents of a multi-document config
+                data = dict(enumerate(data))
+            values = flatten(data) if isinstance(data, Mapping) else {}
+            keys = sorted(values)
+        else:
+            keys, values = base._build()
+            keys, values = list(keys), dict(values)
+            for path in changed:
+                self._apply(keys, values, path)
+        self._built = built = (keys, values)
+        self._base = None  # Let the previous snapshot go
+        return built
+
+    def _apply(self, keys, values, path):
+        """
+        Re-flatten the subtree at path, and refresh its ancestors
+        (their mappings were copied by the edit)
+        """
+        key = '.'.join(str(name) for name in path)
+        start, end = _span(keys, key)
+        for old in keys[start:end]:
+            del values[old]
+        del keys[start:end]
+        value = lookup(self.data, path, _MISSING)
+        if value is _MISSING:
+            if values.pop(key, _MISSING) is not _MISSING:
+                del keys[bisect_left(keys, key)]
+        else:
+            below = flatten(value, key + '.') if isinstance(value, Mapping) else {}
+            keys[start:start] = sorted(below)
+            values.update(below)
+            self._store(keys, values, key, value)
+        for depth in range(1, len(path)):
+            self._store(keys, values, '.'.join(str(name) for name in path[:depth]), lookup(self.data, path[:depth]))
+
+    @staticmethod
+    def _store(keys, values, key, value):
+        if key not in values:
+            keys.insert(bisect_left(keys, key), key)
+        values[key] = value
+
+    def __len__(self):
+        return len(self._build()[0])
+
+    def keys(self, prefix=None):
+        """
+        Sorted dotted keys of every node below prefix (all nodes without one)
+        """
+        keys, values = self._build()
+        if prefix is None:
+            return list(keys)
+        start, end = _span(keys, prefix)
+        return keys[start:end]
+
+    def items(self, prefix=None, leaves=True):
+        """
+        Sorted `(dotted key, value)` pairs below prefix. With `leaves`,
+        nodes holding non-empty mappings are left out.
+        """
+        values = self._build()[1]
+        pairs = ((key, values[key]) for key in self.keys(prefix))
+        if leaves:
+            return [(key, value) for key, value in pairs if not (isinstance(value, Mapping) and value)]
+        return list(pairs)
+
+    def find(self, pattern):
+        """
+        Sorted `(dotted key, value)` pairs of the nodes matching pattern,
+        a dotted key whose segments may hold shell-style wildcards
+        """
+        keys, values = self._build()
+        segments = pattern.split('.')
+        literal = 0
+        while literal < len(segments) and not _WILDCARDS.intersection(segments[literal]):
+            literal += 1
+        if literal == len(segments):
+            return [(pattern, values[pattern])] if pattern in values else []
+        if literal:
+            candidates = self.keys('.'.join(segments[:literal]))
+        else:
+            candidates = keys
+        matches = []
+        for key in candidates:
+            names = key.split('.')
+            if len(names) == len(segments) and all(_segment_matches(p, n)
+                                                   for p, n in zip(segments[literal:], names[literal:])):
+                matches.append((key, values[key]))
+        return matches
@@ -0,0 +1,360 @@
+"""
+`${...}` references between config values, resolved once per load.
+
+::
+
+    db:
+      host: db1.internal
+      url: postgres://${db.host}:${db.port}/app
+      port: 5432
+    paths:
+      base: ${env:HOME}/app
+      logs: ${paths.base}/logs
+
+A reference names a dotted key (`${db.host}`) or an environment
+variable (`${env:HOME}`), optionally with a fallback for when it is
+missing (`${env:PORT:-8080}`). A value made of a single reference takes
+the referenced value as is, of any type; otherwise references are
+formatted into the string. `$${` is a literal `${`.
+
+Strings holding references (templates) are collected when a config
+loads and resolved in dependency order, so a reference to a value that
+itself holds references sees its result. Cycles raise
+`InterpolationError`. The results are stored in the published data, so
+reading them is a plain lookup. After an edit only the templates that
+depend on the edited key, directly or not, are resolved again.
+"""
+import os
+import re
+from collections.abc import Mapping
+
+from .lazy import resolve
+
+_MISSING = object()
+_REFERENCE = re.compile(r'\$\$\{|\$\{([^${}]*)\}')
+_SEQUENCES = (list, tuple)
+
+
+class InterpolationError(Exception):
+    """Raised when a reference is missing, malformed or part of a cycle"""
+    pass
+
+
+def parse(text):
+    """
+    Split text into literal strings and `(kind, name, default)`
+    references, or return None if it holds no references
+    """
+    parts, position, found = [], 0, False
+    for match in _REFERENCE.finditer(text):
+        parts.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1) is None:
+            parts.append('${')  # Escaped
+            found = True  # Still a template, so the escape is unwrapped
+            continue
+        body, fallback, default = match.group(1).partition(':-')
+        if body.startswith('env:'):
+            reference = ('env', body[4:])
+        else:
+            reference = ('key', tuple(body.split('.')))
+        if not body or not reference[1]:
+            raise InterpolationError('Empty reference in {!r}'.format(text))
+        parts.append(reference + (default if fallback else _MISSING,))
+        found = True
+    if not found:
+        return None
+    parts.append(text[position:])
+    return [part for part in parts if part != '']
+
+
+def scan(data, path=(), into=None):
+    """
+    Return `{path: parts}` for every template below data. Paths are
+    tuples of keys, with list positions as strings (`('hosts', '0')`).
+    """
+    if into is None:
+        into = {}
+    if isinstance(data, Mapping):
+        children = data.items()
+    elif isinstance(data, _SEQUENCES):
+        children = ((str(i), value) for i, value in enumerate(data))
+    else:
+        if isinstance(data, str) and '${' in data:
+            parts = parse(data)
+            if parts is not None:
+                into[path] = parts
+        return into
+    for name, value in children:
+        scan(resolve(value), path + (name,), into)
+    return into
+
+
+def _child(node, name):
+    if isinstance(node, Mapping):
+        return resolve(node.get(name, _MISSING))
+    if isinstance(node, _SEQUENCES) and isinstance(name, str) and name.isdigit() and int(name) < len(node):
+        return node[int(name)]
+    return _MISSING
+
+
+def lookup(data, path):
+    for name in path:
+        data = _child(data, name)
+        if data is _MISSING:
+            break
+    return data
+
+
+def _assign(root, path, value, fresh):
+    """
+    Set path in root to value (removing it if value is `_MISSING`),
+    copying containers along the way unless they are in fresh
+    (those created by this pass). Returns the new root.
+    """
+    def copy(node):
+        if id(node) in fresh:
+            return node
+        node = dict(node) if isinstance(node, Mapping) else list(node)
+        fresh.add(id(node))
+        return node
+
+    root = parent = copy(root)
+    for name in path[:-1]:
+        key = int(name) if isinstance(parent, list) else name
+        child = resolve(parent[key]) if isinstance(parent, list) else resolve(parent.get(key, _MISSING))
+        if child is _MISSING:  # An edit creating new mappings
+            child = {}
+            fresh.add(id(child))
+        parent[key] = parent = copy(child)
+    key = int(path[-1]) if isinstance(parent, list) else path[-1]
+    if value is _MISSING:
+        parent.pop(key, None)
+    else:
+        parent[key] = value
+    return root
+
+
+def _mapping_path(data, path):
+    """
+    The part of path that only goes through mappings
+    """
+    for depth, name in enumerate(path):
+        if not isinstance(data, Mapping):
+            return path[:depth]
+        data = resolve(data.get(name))
+    return path
+
+
+def _dotted(path):
+    return '.'.join(str(name) for name in path)
+
+
+def _overlaps(a, b):
+    """
+    Whether one path is the other or one of its ancestors
+    """
+    size = min(len(a), len(b))
+    return a[:size] == b[:size]
+
+
+class References(object):
+    """
+    The templates of a resolved tree, indexed by the paths they sit at
+    and the keys they refer to, so the templates depending on a key
+    are found without scanning them all. Shared by snapshots: edits
+    work on a `copy`, which copies the index sets it changes.
+    """
+    __slots__ = ('templates', 'below', 'referrers', 'watchers', '_owned')
+
+    def __init__(self, templates=()):
+        self.templates = {}  # Path -> parts
+        self.below = {}  # Path -> templates at or below it
+        self.referrers = {}  # Referenced key -> templates referring to it
+        self.watchers = {}  # Path -> templates referring to it or to a key below it
+        self._owned = None  # Ids of the sets this copy may modify, None if it owns them all
+        for path, parts in dict(templates).items():
+            self.add(path, parts)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def copy(self):
+        copy = References.__new__(References)
+        copy.templates = dict(self.templates)
+        copy.below = dict(self.below)
+        copy.referrers = dict(self.referrers)
+        copy.watchers = dict(self.watchers)
+        copy._owned = set()
+        return copy
+
+    def _entry(self, index, key):
+        entry = index.get(key)
+        if entry is None:
+            entry = index[key] = set()
+        elif self._owned is not None and id(entry) not in self._owned:
+            entry = index[key] = set(entry)
+        if self._owned is not None:
+            self._owned.add(id(entry))
+        return entry
+
+    def _discard(self, index, key, value):
+        entry = self._entry(index, key)
+        entry.discard(value)
+        if not entry:
+            del index[key]
+
+    @staticmethod
+    def _keys(parts):
+        return set(part[1] for part in parts if part.__class__ is tuple and part[0] == 'key')
+
+    def add(self, path, parts):
+        if path in self.templates:
+            self.remove(path)
+        self.templates[path] = parts
+        for depth in range(len(path) + 1):
+            self._entry(self.below, path[:depth]).add(path)
+        for key in self._keys(parts):
+            self._entry(self.referrers, key).add(path)
+            for depth in range(1, len(key) + 1):
+                self._entry(self.watchers, key[:depth]).add(path)
+
+    def remove(self, path):
+        parts = self.templates.pop(path)
+        for depth in range(len(path) + 1):
+            self._discard(self.below, path[:depth], path)
+        for key in self._keys(parts):
+            self._discard(self.referrers, key, path)
+            for depth in range(1, len(key) + 1):
+                self._discard(self.watchers, key[:depth], path)
+
+    def dependencies(self, path):
+        """
+        Templates whose results the template at path reads
+        """
+        needs = set()
+        for key in self._keys(self.templates[path]):
+            needs.update(self.below.get(key, ()))
+            needs.update(key[:depth] for depth in range(1, len(key)) if key[:depth] in self.templates)
+        return needs
+
+    def referencing(self, path):
+        """
+        Templates reading the value at path: those referring to
+        it, to one of its ancestors or to a key below it
+        """
+        found = set(self.watchers.get(path, ()))
+        for depth in range(1, len(path)):
+            found.update(self.referrers.get(path[:depth], ()))
+        return found
+
+    def order(self, targets):
+        """
+        Targets in dependency order. Templates outside targets are
+        taken as already resolved.
+        """
+        order, done, active = [], set(), []
+        visiting = set()
+        for target in [t for t in self.templates if t in targets]:  # In document order
+            if target in done:
+                continue
+            stack = [(target, iter(self.dependencies(target) & targets))]
+            visiting.add(target)
+            active.append(target)
+            while stack:
+                path, needs = stack[-1]
+                for need in needs:
+                    if need in visiting:
+                        cycle = active[active.index(need):] + [need]
+                        raise InterpolationError('Reference cycle: {}'.format(
+                            ' -> '.join(_dotted(p) for p in cycle)))
+                    if need not in done:
+                        visiting.add(need)
+                        active.append(need)
+                        stack.append((need, iter(self.dependencies(need) & targets)))
+                        break
+                else:
+                    stack.pop()
+                    visiting.discard(path)
+                    active.pop()
+                    done.add(path)
+                    order.append(path)
+        return order
+
+    def affected(self, path):
+        """
+        Templates to resolve again after the value at path changed:
+        those below it and every template depending on it, directly
+        or through other templates
+        """
+        pending = list(self.below.get(path, ())) + list(self.referencing(path))
+        affected = set()
+        while pending:
+            template = pending.pop()
+            if template not in affected:
+                affected.add(template)
+                pending.extend(self.referencing(template))
+        return affected
+
+    def resolve(self, data, targets, environ=None):
+        """
+        Return data with the targets resolved, in dependency order
+        """
+        environ = os.environ if environ is None else environ
+        fresh = set()
+        for path in self.order(targets):
+            data = _assign(data, path, self._render(data, path, environ), fresh)
+        return data
+
+    def _render(self, data, path, environ):
+        parts = self.templates[path]
+        values = []
+        for part in parts:
+            if part.__class__ is not tuple:
+                values.append(part)
+                continue
+            kind, name, default = part
+            value = environ.get(name, _MISSING) if kind == 'env' else lookup(data, name)
+            if value is _MISSING:
+                if default is _MISSING:
+                    raise InterpolationError('{} refers to {}, which is not set'.format(
+                        _dotted(path), 'environment variable ' + name if kind == 'env' else _dotted(name)))
+                value = default
+            values.append(value)
+        if len(values) == 1:
+            return values[0]  # A lone reference keeps the referenced value's type
+        for value in values:
+            if isinstance(value, (Mapping,) + _SEQUENCES):
+                raise InterpolationError('{} formats a mapping or list into a string'.format(_dotted(path)))
+        return ''.join(value if isinstance(value, str) else str(value) for value in values)
+
+
+def interpolate(data, environ=None):
+    """
+    Resolve every template in data. Returns `(data, references)`.
+    """
+    references = References(scan(data))
+    if references.templates:
+        data = references.resolve(data, set(references.templates), environ)
+    return data, references
+
+
+def update(previous, data, new, path, environ=None):
+    """
+    Apply an edit at path to data, the tree resolved with references
+    previous: the value at path is taken from new (unresolved), and only
+    the templates affected by it are resolved again. Returns
+    `(data, references, resolved paths)`.
+    """
+    value = lookup(new, path)
+    data = _assign(data, path, value, set())
+    references = previous.copy()
+    for template in list(references.below.get(path, ())):
+        references.remove(template)
+    if value is not _MISSING:
+        for template, parts in scan(value, path).items():
+            references.add(template, parts)
+    targets = references.affected(path)
+    if targets:
+        data = references.resolve(data, targets, environ)
+    return data, references, tuple(_mapping_path(data, target) for target in targets)
@@ -0,0 +1,149 @@
+"""
+Layered configs: several sources stacked with a defined precedence.
+
+::
+
+    >>> config = yact.LayeredConfig(['/etc/app.yaml', 'host.yaml', 'production.yaml'])
+    >>> config['db.host']  # From the highest layer defining it
+    'db1.prod'
+
+The merged tree is computed up front and kept up to date as layers
+change, so lookups are a single walk of one tree, never a search
+through every layer.
+"""
+from collections.abc import Mapping
+
+from .config import Config, from_file
+from .diff import diff
+from .lazy import resolve
+
+_MISSING = object()
+
+
+def merge(base, override):
+    """
+    Deep merge two trees. Mappings are merged key by key; anything
+    else in override replaces what is in base. Untouched subtrees
+    are shared, not copied.
+    """
+    if not (isinstance(base, Mapping) and isinstance(override, Mapping)):
+        return override
+    merged = dict(base)
+    for key, value in override.items():
+        merged[key] = merge(base[key], value) if key in base else value
+    return merged
+
+
+class LayeredConfig(Config):
+    """
+    Read-mostly view over a stack of `Config` objects (or filenames),
+    lowest precedence first. `set`, `remove`, `save` and `batch` act on
+    the top layer. When a layer reloads, only the top-level sections
+    that changed in it are re-merged.
+    """
+
+    def __init__(self, layers, auto_reload=False, **kwargs):
+        super(LayeredConfig, self).__init__(filename=None, auto_reload=auto_reload, **kwargs)
+        if not layers:
+            raise ValueError('LayeredConfig needs at least one layer')
+        self.layers = [layer if isinstance(layer, Config) else from_file(layer, auto_reload=auto_reload)
+                       for layer in layers]
+        self._layer_subscriptions = [layer.subscribe(None, self._layer_changed) for layer in self.layers]
+        self.refresh_merged()
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.layers)
+
+    def __getstate__(self):
+        state = super(LayeredConfig, self).__getstate__()
+        del state['_layer_subscriptions']  # Subscriptions stay behind with the layers' locks
+        return state
+
+    def __setstate__(self, state):
+        super(LayeredConfig, self).__setstate__(state)
+        self._layer_subscriptions = [layer.subscribe(None, self._layer_changed) for layer in self.layers]
+
+    def _merge_section(self, name):
+        merged = _MISSING
+        for layer in self.layers:
+            data = layer._data
+            value = data.get(name, _MISSING) if isinstance(data, Mapping) else _MISSING
+            if value is not _MISSING:
+                value = resolve(value)
+                merged = value if merged is _MISSING else merge(merged, value)
+        return merged
+
+    def refresh_merged(self, sections=None):
+        """
+        Rebuild the merged tree, or only the given top-level sections
+        """
+        with self._writing():
+            if sections is None:
+                data = {}
+                sections = set()
+                for layer in self.layers:
+                    if isinstance(layer._data, Mapping):
+                        sections.update(layer._data)
+            else:
+                data = dict(self._snapshot.source)
+            for name in sections:
+                value = self._merge_section(name)
+                if value is _MISSING:
+                    data.pop(name, None)
+                else:
+                    data[name] = value
+            self._publish(self._overlay(data), source=data)
+
+    def _layer_changed(self, key, old, new):
+        sections = set()
+        for path in diff(old, new):
+            if not path:  # The layer's root was replaced by a non-mapping
+                return self.refresh_merged()
+            sections.add(path[0])
+        self.refresh_merged(sections)
+
+    def refresh(self):
+        """
+        Reload every layer; the merged view follows their changes
+        """
+        for layer in self.layers:
+            layer.refresh()
+        if self.auto_reload is True:
+            self.start_file_watch()
+
+    def start_file_watch(self, interval=5, scheduler=None):
+        for layer in self.layers:
+            layer.start_file_watch(interval, scheduler)
+
+    def stop_file_watch(self):
+        for layer in self.layers:
+            layer.stop_file_watch()
+
+    @property
+    def config_file_changed(self):
+        return any(layer.config_file_changed for layer in self.layers)
+
+    def batch(self):
+        return self.layers[-1].batch()
+
+    transaction = batch
+
+    def set(self, key, value):
+        self.layers[-1].set(key, value)
+
+    def remove(self, key):
+        self.layers[-1].remove(key)
+
+    def save(self, skip_unchanged=None):
+        return self.layers[-1].save(skip_unchanged)
+
+    def __setitem__(self, key, value):
+        self.layers[-1][key] = value
+
+    def close(self):
+        """
+        Detach from the layers so this view stops following them
+        """
+        for layer, subscription in zip(self.layers, self._layer_subscriptions):
+            layer.unsubscribe(subscription)
+        self._layer_subscriptions = []
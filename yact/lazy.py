@@ -0,0 +1,171 @@
+"""
+Lazy loading for large YAML configs.
+
+In lazy mode only the top-level keys of a document are indexed at load
+time, together with the span of text holding each value. A section is
+parsed the first time something reads it, so a process that only looks
+at `db.host` never builds the rest of a huge generated file.
+
+Documents that cannot be split safely (anchors and aliases, tag
+directives, flow-style or non-mapping roots, complex keys, multiple
+documents) are loaded eagerly instead.
+"""
+from collections.abc import Mapping
+
+import yaml
+
+
+class Deferred(object):
+    """
+    A top-level value that has not been parsed yet. `value` parses it
+    (once) and returns it. Two deferred values with identical source
+    text are equal without parsing either.
+    """
+    __slots__ = ('text', 'start', 'end', 'loader', '_value')
+
+    _UNSET = object()
+
+    def __init__(self, text, start, end, loader):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.loader = loader
+        self._value = self._UNSET
+
+    @property
+    def loaded(self):
+        return self._value is not self._UNSET
+
+    @property
+    def source(self):
+        return self.text[self.start:self.end]
+
+    @property
+    def value(self):
+        value = self._value
+        if value is self._UNSET:
+            parsed = yaml.load(self.source, Loader=self.loader)  # A one key mapping: {key: value}
+            value = self._value = next(iter(parsed.values()))
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, Deferred):
+            if self.loader is other.loader and self.source == other.source:
+                return True
+            other = other.value
+        return self.value == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        """
+        Pickle by source text, keeping a pending value pending: the
+        `_UNSET` sentinel is a different object in every process
+        """
+        if self.loaded:
+            return _loaded, (self.text, self.start, self.end, self.loader, self._value)
+        return Deferred, (self.text, self.start, self.end, self.loader)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, 'loaded' if self.loaded else 'pending')
+
+
+def _loaded(text, start, end, loader, value):
+    deferred = Deferred(text, start, end, loader)
+    deferred._value = value
+    return deferred
+
+
+def resolve(value):
+    """
+    Return the parsed value of a possibly deferred value
+    """
+    return value.value if value.__class__ is Deferred else value
+
+
+def materialize(data):
+    """
+    Return data with every deferred top-level value parsed. The
+    original mapping is left untouched.
+    """
+    if not isinstance(data, Mapping) or not any(value.__class__ is Deferred for value in data.values()):
+        return data
+    return {key: resolve(value) for key, value in data.items()}
+
+
+def _decode(raw):
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8')
+    return raw[1:] if raw.startswith(u'\ufeff') else raw
+
+
+def index(raw, loader):
+    """
+    Index the top-level keys of a single YAML document. Returns a dict
+    of key -> `Deferred`, or None if the document has to be loaded eagerly.
+    """
+    try:
+        text = _decode(raw)
+    except UnicodeDecodeError:
+        return None
+    parser = loader(text)
+    try:
+        parser.get_event()  # StreamStart
+        if parser.check_event(yaml.StreamEndEvent):
+            return None  # Empty stream, nothing to gain
+        document = parser.get_event()
+        if getattr(document, 'tags', None):
+            return None
+        root = parser.get_event()
+        if not isinstance(root, yaml.MappingStartEvent) or root.flow_style or root.anchor or root.tag:
+            return None
+        keys = []  # (key start, key end)
+        depth = 0
+        expect_key = True
+        while True:
+            event = parser.get_event()
+            if isinstance(event, yaml.AliasEvent) or getattr(event, 'anchor', None):
+                return None
+            if depth == 0:
+                if isinstance(event, yaml.MappingEndEvent):
+                    break
+                if expect_key:
+                    if not isinstance(event, yaml.ScalarEvent):
+                        return None  # Complex key
+                    keys.append((event.start_mark.index, event.end_mark.index))
+                    expect_key = False
+                    continue
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            if depth == 0:
+                expect_key = True
+        parser.get_event()  # DocumentEnd
+        if not parser.check_event(yaml.StreamEndEvent):
+            return None  # More than one document
+    except yaml.YAMLError:
+        return None  # Let the eager loader report the error
+    finally:
+        parser.dispose()
+    data = {}
+    for i, (start, end) in enumerate(keys):
+        stop = keys[i + 1][0] if i + 1 < len(keys) else len(text)
+        key = yaml.load(text[start:end], Loader=loader)
+        data[key] = Deferred(text, start, stop, loader)
+    return data
+
+
+def lazy_load(raw, backend, unsafe=False):
+    """
+    Load raw YAML through backend, deferring top-level values when possible
+    """
+    loader = getattr(backend, 'unsafe_loader' if unsafe else 'safe_loader', None)
+    if loader is not None:
+        data = index(raw, loader)
+        if data is not None:
+            return data
+    return backend.load(raw, unsafe=unsafe)
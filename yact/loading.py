@@ -0,0 +1,118 @@
+"""
+Loading many config files at once.
+
+Services that assemble their configuration from dozens of fragments
+(a `conf.d` directory, say) can resolve and parse them in one go:
+
+::
+
+    >>> configs = yact.from_files(['app.yaml', 'logging.yaml'])
+    >>> config = yact.load_directory('/etc/app/conf.d', merge=True)
+
+Each search prefix is listed once with `os.scandir` rather than
+probing every file in every prefix, and files are parsed concurrently
+in a thread pool (or a process pool with `processes=True`, which
+sidesteps the GIL for pure-Python parsing).
+"""
+import os
+import logging
+from fnmatch import fnmatch
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .config import Config, MissingConfig, search_prefixes
+from .layered import LayeredConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _scan(prefix):
+    """
+    Map names of the regular files in prefix to their paths
+    """
+    try:
+        with os.scandir(prefix) as entries:
+            return {entry.name: entry.path for entry in entries if entry.is_file()}
+    except OSError:
+        return {}
+
+
+def resolve_paths(filenames, directory=None):
+    """
+    Find every filename the way `from_file` does, listing each
+    search prefix at most once. Raises `MissingConfig` for the
+    first file that cannot be found.
+    """
+    prefixes = search_prefixes(directory)
+    listings = {}
+
+    def listing(prefix):
+        if prefix not in listings:
+            listings[prefix] = _scan(prefix)
+        return listings[prefix]
+
+    paths = []
+    for filename in filenames:
+        if os.path.basename(filename) != filename:  # Contains a directory part, probe directly
+            if os.path.isfile(filename):
+                paths.append(filename)
+                continue
+            candidates = (os.path.join(p, filename) for p in prefixes)
+            path = next((c for c in candidates if os.path.isfile(c)), None)
+        else:
+            path = listing(os.path.curdir).get(filename)  # from_file accepts paths relative to the cwd first
+            for prefix in prefixes:
+                if path is not None:
+                    break
+                path = listing(prefix).get(filename)
+        if path is None:
+            raise MissingConfig('{} does not exist'.format(filename))
+        logger.debug('Found {} at {}'.format(filename, path))
+        paths.append(path)
+    return paths
+
+
+def _load(path, kwargs):
+    config = Config(filename=path, **kwargs)
+    config.refresh()
+    return config
+
+
+def from_files(filenames, directory=None, merge=False, workers=None, processes=False, **kwargs):
+    """
+    Load several config files concurrently. Files are found like
+    `from_file` finds them, searching `directory` first.
+
+    Returns a list of `Config` objects in the order given, or with
+    `merge=True` a single `LayeredConfig` in which later files take
+    precedence. Other keyword arguments are passed on to `Config`.
+    """
+    paths = resolve_paths(filenames, directory)
+    auto_reload = kwargs.pop('auto_reload', False)
+    if len(paths) <= 1:
+        configs = [_load(path, kwargs) for path in paths]
+    elif processes:  # Configs pickle with their parsed data, so workers send them back whole
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            configs = list(pool.map(_load, paths, repeat(kwargs)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            configs = list(pool.map(_load, paths, repeat(kwargs)))
+    if auto_reload:
+        for config in configs:
+            config.auto_reload = True
+            config.start_file_watch()
+    if merge:
+        return LayeredConfig(configs, auto_reload=auto_reload)
+    return configs
+
+
+def load_directory(path, pattern='*.yaml', merge=False, **kwargs):
+    """
+    Load every file in path matching pattern (a glob, or a list of
+    globs), in name order, as with `from_files`.
+    """
+    patterns = [pattern] if isinstance(pattern, str) else list(pattern)
+    with os.scandir(path) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.is_file() and any(fnmatch(entry.name, p) for p in patterns))
+    return from_files([os.path.join(path, name) for name in names], merge=merge, **kwargs)
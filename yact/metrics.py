@@ -0,0 +1,193 @@
+"""
+Optional instrumentation for `Config`.
+
+::
+
+    >>> config = yact.from_file('app.yaml', metrics=True)
+    >>> config.stats()['histograms']['parse_seconds']['count']
+    1
+
+Metrics are off unless a config is created with `metrics=True` (or a
+`Metrics` instance). Disabled configs pay a single `is None` check on
+their hot paths. Enabled configs record:
+
+* `parse_seconds`, `hash_seconds`, `save_seconds` and `poll_seconds`
+  (time spent by the file watcher checking the file)
+* `lock_wait_seconds` and `lock_hold_seconds` for the writer lock
+* `lookup_hits`/`lookup_misses` of the per-snapshot lookup cache
+* `reloads`/`reload_failures`
+
+`PrometheusExporter` renders the metrics of any number of configs in
+the Prometheus text format; anything with a `render()` method can take
+its place.
+"""
+import weakref
+import threading
+from itertools import count
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+# Upper bounds, in seconds
+DEFAULT_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+
+class Histogram(object):
+    """
+    Per-bucket (not cumulative) counts plus the sum and count of observed values
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum, 'buckets': list(zip(self.buckets, self.counts))}
+
+
+class Metrics(object):
+    """
+    Counters and latency histograms of one config
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        # Bumped on every lookup with next(), which is atomic without taking the lock.
+        # Reading one advances it as well, so reads are counted under the lock.
+        self.lookup_hits = count()
+        self.lookup_misses = count()
+        self._reads = {'lookup_hits': 0, 'lookup_misses': 0}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name):
+        """
+        Observe the duration of the block under `<name>_seconds`
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name + '_seconds', perf_counter() - start)
+
+    @contextmanager
+    def locked(self, lock):
+        """
+        Hold lock for the block, observing how long it took
+        to acquire and how long it was held
+        """
+        start = perf_counter()
+        with lock:
+            acquired = perf_counter()
+            try:
+                yield
+            finally:
+                released = perf_counter()
+                self.observe('lock_wait_seconds', acquired - start)
+                self.observe('lock_hold_seconds', released - acquired)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            for name, reads in self._reads.items():
+                value = next(getattr(self, name)) - reads
+                self._reads[name] = reads + 1
+                if value:
+                    counters[name] = value
+            return {
+                'counters': counters,
+                'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.lookup_hits = count()
+            self.lookup_misses = count()
+            self._reads = dict.fromkeys(self._reads, 0)
+
+
+def get_metrics(metrics):
+    """
+    Resolve the `metrics` argument of `Config`: True creates
+    a `Metrics` instance, False/None disables metrics
+    """
+    if metrics is True:
+        return Metrics()
+    return metrics or None
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrometheusExporter(object):
+    """
+    Renders the stats of registered configs in the Prometheus text
+    exposition format, labelled by file. Configs are held weakly.
+
+    ::
+
+        >>> exporter = yact.PrometheusExporter()
+        >>> exporter.register(config)
+        >>> print(exporter.render())
+    """
+
+    def __init__(self, prefix='yact'):
+        self.prefix = prefix
+        self._configs = weakref.WeakSet()
+
+    def register(self, config):
+        self._configs.add(config)
+        return config
+
+    def unregister(self, config):
+        self._configs.discard(config)
+
+    def render(self):
+        series = {}  # metric name -> (type, [lines])
+        for config in list(self._configs):
+            stats = config.stats()
+            labels = 'file="{}"'.format(_label(config.filename))
+            self._add(series, 'generation', 'gauge', '{}{{{}}} {}', labels, stats['generation'])
+            for name, value in sorted(stats.get('counters', {}).items()):
+                self._add(series, name + '_total', 'counter', '{}{{{}}} {}', labels, value)
+            for name, histogram in sorted(stats.get('histograms', {}).items()):
+                cumulative = 0
+                for bound, count in histogram['buckets']:
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    self._add(series, name, 'histogram', '{}_bucket{{{},le="' + le + '"}} {}', labels, cumulative)
+                self._add(series, name, 'histogram', '{}_sum{{{}}} {}', labels, histogram['sum'])
+                self._add(series, name, 'histogram', '{}_count{{{}}} {}', labels, histogram['count'])
+        lines = []
+        for name, (kind, samples) in sorted(series.items()):
+            lines.append('# TYPE {} {}'.format(name, kind))
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def _add(self, series, name, kind, template, labels, value):
+        name = '{}_{}'.format(self.prefix, name)
+        series.setdefault(name, (kind, []))[1].append(template.format(name, labels, value))
@@ -0,0 +1,147 @@
+"""
+Environment variable and command line overrides.
+
+::
+
+    >>> overrides = yact.Overrides(env_prefix='APP', args=['db.port=5433'])
+    >>> config = yact.from_file('app.yaml', overrides=overrides)
+    >>> config['db.host']  # APP_DB__HOST=db1.prod in the environment
+    'db1.prod'
+
+Environment variables named `<prefix>_<KEY>` override the lowercased
+key, with `__` separating nesting levels (`APP_DB__HOST` is `db.host`).
+Assignments (`db.port=5433`, typically collected from `--set` options)
+use dotted keys. Values are coerced the way YAML would read them, so
+`5433` is an int and `true` a bool.
+
+Precedence, lowest first: the file, environment variables, assignments.
+Overrides are resolved and laid over the loaded tree once per refresh
+or edit, so lookups stay a single walk of one tree; the file is always
+saved without them.
+"""
+import os
+import sys
+from collections.abc import Mapping
+
+import yaml
+
+from .lazy import resolve
+
+
+def coerce(value):
+    """
+    Read a string value the way YAML would, keeping it as a string
+    if it does not parse to a scalar
+    """
+    if not value:
+        return value
+    try:
+        parsed = yaml.safe_load(value)
+    except yaml.YAMLError:
+        return value
+    return value if isinstance(parsed, (dict, list)) or parsed is None else parsed
+
+
+def parse_assignment(assignment):
+    """
+    Split `'db.port=5433'` into `(('db', 'port'), 5433)`
+    """
+    key, sep, value = assignment.partition('=')
+    if not sep or not key.strip():
+        raise ValueError('Invalid override {!r}, expected key=value'.format(assignment))
+    return tuple(key.strip().split('.')), coerce(value)
+
+
+def set_args(argv=None, option='--set'):
+    """
+    Collect the values of every `--set key=value` (or `--set=key=value`)
+    option in argv, which defaults to `sys.argv[1:]`
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    values = []
+    argv = iter(argv)
+    for arg in argv:
+        if arg == option:
+            value = next(argv, None)
+            if value is None:
+                raise ValueError('{} needs a key=value argument'.format(option))
+            values.append(value)
+        elif arg.startswith(option + '='):
+            values.append(arg[len(option) + 1:])
+    return values
+
+
+def apply(data, overrides):
+    """
+    Return data with each `(path, value)` in overrides set, in order.
+    Only the mappings along overridden paths are copied.
+    """
+    if not overrides:
+        return data
+    root = dict(data) if isinstance(data, Mapping) else {}
+    copied = {id(root)}
+    for path, value in overrides:
+        parent = root
+        for name in path[:-1]:
+            child = resolve(parent.get(name))
+            if id(child) not in copied:
+                child = dict(child) if isinstance(child, Mapping) else {}
+                copied.add(id(child))
+                parent[name] = child
+            parent = child
+        parent[path[-1]] = value
+    return root
+
+
+class Overrides(object):
+    """
+    Override layer for a `Config`: environment variables starting with
+    `env_prefix` plus `key=value` assignments in `args`. The environment
+    is read from `environ` (defaults to `os.environ`) when the config
+    refreshes; assignments are parsed once, here.
+    """
+
+    def __init__(self, env_prefix=None, args=(), environ=None, separator='__'):
+        if env_prefix and not env_prefix.endswith('_'):
+            env_prefix += '_'
+        self.env_prefix = env_prefix
+        self.separator = separator
+        self.environ = environ
+        self.args = [parse_assignment(arg) for arg in args]
+        self._resolved = (None, None)  # (environment snapshot, overrides), swapped as one
+
+    def __repr__(self):
+        return '{}(env_prefix={!r}, args={!r})'.format(self.__class__.__name__, self.env_prefix, self.args)
+
+    def _environment(self):
+        """
+        The relevant part of the environment, as a comparable snapshot
+        """
+        prefix = self.env_prefix
+        if not prefix:
+            return ()
+        environ = os.environ if self.environ is None else self.environ
+        return tuple(sorted((k, v) for k, v in environ.items() if k.startswith(prefix) and len(k) > len(prefix)))
+
+    def _path(self, name):
+        return tuple(part.lower() for part in name[len(self.env_prefix):].split(self.separator))
+
+    @property
+    def changed(self):
+        """
+        Whether the environment moved since overrides were last resolved
+        """
+        return self._environment() != self._resolved[0]
+
+    def resolve(self):
+        """
+        Return the `(path, value)` overrides in precedence order,
+        re-reading environment values only when they changed
+        """
+        environment = self._environment()
+        snapshot, resolved = self._resolved
+        if resolved is None or environment != snapshot:
+            resolved = [(self._path(k), coerce(v)) for k, v in environment] + self.args
+            self._resolved = (environment, resolved)
+        return resolved
@@ -0,0 +1,209 @@
+"""
+Schemas validated and coerced once, when data is loaded.
+
+A schema is declared as a dataclass, a TypedDict, or a plain dict
+spec mapping keys to types (and nested specs):
+
+::
+
+    >>> schema = {'db': {'host': str, 'port': int, 'replicas': List[str]}}
+    >>> config = yact.from_file('app.yaml', schema=schema)
+    >>> config.typed.db.port
+    5432
+
+`compile_schema` turns the declaration into a tree of converter
+functions up front, so each reload runs the converters without
+inspecting types again, and lookups through `config.typed` are
+plain attribute reads.
+"""
+import types
+import typing
+import dataclasses
+from collections.abc import Mapping, Sequence
+
+from .lazy import resolve
+
+_MISSING = object()
+_NONE = type(None)
+_UNION = getattr(types, 'UnionType', typing.Union)  # `int | None` on Python 3.10+
+_TRUE = frozenset(['true', 'yes', 'on', '1'])
+_FALSE = frozenset(['false', 'no', 'off', '0'])
+
+
+class SchemaError(Exception):
+    """Raised when config data does not match its schema"""
+    pass
+
+
+def _fail(path, message):
+    raise SchemaError('{}: {}'.format('.'.join(path) or '<root>', message))
+
+
+def _to_int(value, path):
+    if isinstance(value, bool):
+        _fail(path, 'expected an integer, got a boolean')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip(), 0)
+        except ValueError:
+            pass
+    _fail(path, 'expected an integer, got {!r}'.format(value))
+
+
+def _to_float(value, path):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    _fail(path, 'expected a number, got {!r}'.format(value))
+
+
+def _to_bool(value, path):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    _fail(path, 'expected a boolean, got {!r}'.format(value))
+
+
+def _to_str(value, path):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    _fail(path, 'expected a string, got {!r}'.format(value))
+
+
+def _any(value, path):
+    return value
+
+
+_SCALARS = {int: _to_int, float: _to_float, bool: _to_bool, str: _to_str, typing.Any: _any, object: _any}
+
+
+def _is_typeddict(spec):
+    return isinstance(spec, type) and issubclass(spec, dict) and hasattr(spec, '__annotations__')
+
+
+def _fields(spec):
+    """
+    (name, type, default, factory) tuples of a dataclass, TypedDict or
+    dict spec. A field has at most one of default and factory; the other
+    is `_MISSING`.
+    """
+    if dataclasses.is_dataclass(spec):
+        hints = typing.get_type_hints(spec)
+        for field in dataclasses.fields(spec):
+            default = _MISSING if field.default is dataclasses.MISSING else field.default
+            factory = _MISSING if field.default_factory is dataclasses.MISSING else field.default_factory
+            yield field.name, hints.get(field.name, field.type), default, factory
+    elif _is_typeddict(spec):
+        required = getattr(spec, '__required_keys__', None)
+        for name, hint in typing.get_type_hints(spec).items():
+            optional = required is not None and name not in required
+            yield name, hint, None if optional else _MISSING, _MISSING
+    else:
+        for name, hint in spec.items():
+            yield name, hint, _MISSING, _MISSING
+
+
+def _compile_record(spec, build):
+    fields = [(name, _compile(hint), default, factory) for name, hint, default, factory in _fields(spec)]
+
+    def convert(value, path):
+        if not isinstance(value, Mapping):
+            _fail(path, 'expected a mapping, got {!r}'.format(value))
+        result = {}
+        for name, converter, default, factory in fields:
+            item = value.get(name, _MISSING)
+            if item is _MISSING:
+                if factory is not _MISSING:
+                    item = factory()  # A fresh value for every conversion
+                elif default is _MISSING:
+                    try:
+                        item = converter(None, path + (name,))  # Optional fields accept a missing key
+                    except SchemaError:
+                        _fail(path + (name,), 'missing required key')
+                else:
+                    item = default
+            else:
+                item = converter(resolve(item), path + (name,))
+            result[name] = item
+        return build(result)
+
+    return convert
+
+
+def _compile(spec):
+    """
+    Return a `converter(value, path)` for a type or schema declaration
+    """
+    if isinstance(spec, Mapping) or _is_typeddict(spec):
+        return _compile_record(spec, lambda fields: types.SimpleNamespace(**fields))
+    if spec in _SCALARS:
+        return _SCALARS[spec]
+    if spec is None or spec is _NONE:
+        def convert_none(value, path):
+            if value is not None:
+                _fail(path, 'expected null, got {!r}'.format(value))
+            return None
+        return convert_none
+    if dataclasses.is_dataclass(spec) and isinstance(spec, type):
+        return _compile_record(spec, lambda fields: spec(**fields))
+    origin = typing.get_origin(spec)
+    args = typing.get_args(spec)
+    if origin is typing.Union or origin is _UNION:
+        options = [_compile(arg) for arg in args]
+        nullable = _NONE in args
+
+        def convert_union(value, path):
+            if value is None and nullable:
+                return None
+            for option in options:
+                try:
+                    return option(value, path)
+                except SchemaError:
+                    continue
+            _fail(path, 'expected {}, got {!r}'.format(spec, value))
+        return convert_union
+    if spec in (list, tuple) or origin in (list, tuple, typing.List, typing.Tuple):
+        item = _compile(args[0]) if args else _any
+        build = tuple if (origin or spec) is tuple else list
+
+        def convert_list(value, path):
+            if isinstance(value, (str, bytes)) or not isinstance(value, Sequence):
+                _fail(path, 'expected a list, got {!r}'.format(value))
+            return build(item(v, path + (str(i),)) for i, v in enumerate(value))
+        return convert_list
+    if spec is dict or origin in (dict, typing.Dict):
+        key = _compile(args[0]) if args else _any
+        item = _compile(args[1]) if args else _any
+
+        def convert_dict(value, path):
+            if not isinstance(value, Mapping):
+                _fail(path, 'expected a mapping, got {!r}'.format(value))
+            return {key(k, path + (str(k),)): item(resolve(v), path + (str(k),)) for k, v in value.items()}
+        return convert_dict
+    raise TypeError('Unsupported schema type {!r}'.format(spec))
+
+
+def compile_schema(spec):
+    """
+    Compile a schema declaration into `validate(data)`, which returns the
+    typed view of data or raises `SchemaError`
+    """
+    converter = _compile(spec)
+
+    def validate(data):
+        return converter(data, ())
+    validate.spec = spec
+    return validate
@@ -0,0 +1,299 @@
+"""
+One loaded config shared by many processes.
+
+Pre-fork servers (gunicorn and friends) would otherwise parse, hold
+and watch the same file once per worker. Instead, one process (the
+master, or a sidecar) publishes every version of its config to a
+shared snapshot, and workers map it:
+
+::
+
+    >>> # In the master, before forking
+    >>> config = yact.from_file('app.yaml', auto_reload=True)
+    >>> publisher = yact.share(config, '/dev/shm/app.yact')
+
+    >>> # In each worker
+    >>> config = yact.from_shared('/dev/shm/app.yact', auto_reload=True)
+    >>> config['db.host']
+
+The snapshot is a 64 byte header file holding a generation counter,
+plus one pickled data file per generation. Publishing writes the data
+file, renames it into place, then bumps the header. Workers keep the
+header memory-mapped, so checking for a new generation is a read of a
+few bytes from shared memory, without stat calls, reads or hashing.
+Only when the generation moved do they unpickle the new data file.
+
+What is shared is the work, not the tree: workers never parse, hash or
+stat the source file, but each one unpickles its own copy of the data
+into its own heap, so N workers still hold N copies. `frozen=True`
+makes those copies compact.
+
+Snapshots are pickles: only share them through a directory you own.
+"""
+import os
+import mmap
+import glob
+import fcntl
+import struct
+import pickle
+import logging
+import weakref
+import threading
+
+from .config import Config, ConfigEditFailed, InvalidConfigFile, atomic_write
+from .frozen import thaw
+from .lazy import materialize
+from .watch import file_signature
+
+logger = logging.getLogger(__name__)
+
+_publishers = weakref.WeakSet()
+
+MAGIC = b'YACTSHM1'
+
+# magic, generation, data size, md5sum of the source file, generation again.
+# Readers retry until both generation fields agree, so a header caught
+# mid-write is never used.
+_HEADER = struct.Struct('<8sQQ32sQ')
+_EMPTY = b'\0' * len(MAGIC)  # A header created but not published to yet
+_RETRIES = 1000
+
+
+def _data_path(path, generation):
+    return '{}.{}'.format(path, generation)
+
+
+class SharedSnapshot(object):
+    """
+    Header and data files of a shared snapshot at path
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._header = None
+        self._writable = False
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.path)
+
+    def __getstate__(self):
+        return {'path': self.path}  # Mappings are reopened on first use
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _open(self, writable=False):
+        if writable and not self._writable:
+            self.close()  # Reopen a reader for writing
+        if self._header is None:
+            if writable and not os.path.exists(self.path):
+                with open(self.path, 'ab') as f:  # Created empty: readers treat it as generation 0
+                    f.truncate(_HEADER.size)
+            fd = os.open(self.path, os.O_RDWR if writable else os.O_RDONLY)
+            try:
+                if os.fstat(fd).st_size < _HEADER.size:
+                    raise ValueError('{} is not a shared config snapshot'.format(self.path))
+                self._header = mmap.mmap(fd, _HEADER.size, access=mmap.ACCESS_READ)
+            except Exception:
+                os.close(fd)
+                raise
+            self._fd = fd
+            self._writable = writable
+        return self._header
+
+    def _consistent(self):
+        """
+        Return the fields of a header that was not caught mid-write
+        """
+        header = self._open()
+        if header[:len(MAGIC)] not in (MAGIC, _EMPTY):
+            raise ValueError('{} is not a shared config snapshot'.format(self.path))
+        for _ in range(_RETRIES):
+            fields = _HEADER.unpack_from(header)
+            if fields[1] == fields[4]:
+                return fields
+        raise ValueError('{} has no consistent header'.format(self.path))
+
+    def header(self):
+        """
+        Return `(generation, size, md5sum)` of the latest published snapshot
+        """
+        _, generation, size, md5sum, _ = self._consistent()
+        return generation, size, md5sum.rstrip(b'\0').decode('ascii') or None
+
+    @property
+    def generation(self):
+        """
+        Generation of the latest published snapshot, 0 if none yet
+        """
+        return self._consistent()[1]
+
+    def publish(self, data, md5sum=None, keep=2):
+        """
+        Publish data as the next generation. Data files older
+        than the last `keep` generations are removed. Publishers
+        in different processes take turns, holding a lock on the
+        header file.
+        """
+        self._open(writable=True)
+        raw = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        md5 = (md5sum or '').encode('ascii')[:32].ljust(32, b'\0')
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            generation = self.header()[0] + 1
+            atomic_write(_data_path(self.path, generation), raw)  # Data in place before the header points at it
+            os.pwrite(self._fd, _HEADER.pack(MAGIC, generation, len(raw), md5, generation), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        for old in glob.glob(glob.escape(self.path) + '.*'):
+            suffix = old[len(self.path) + 1:]
+            if suffix.isdigit() and int(suffix) <= generation - keep:
+                try:
+                    os.unlink(old)
+                except OSError:
+                    pass
+        return generation
+
+    def read(self):
+        """
+        Return `(generation, data, md5sum)` of the latest snapshot,
+        or None if nothing has been published yet
+        """
+        for _ in range(10):  # The generation may be superseded (and removed) while mapping it
+            generation, size, md5sum = self.header()
+            if not generation:
+                return None
+            try:
+                with open(_data_path(self.path, generation), 'rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        data = pickle.loads(mapped)  # Builds this process's own copy of the tree
+                return generation, data, md5sum
+            except FileNotFoundError:
+                continue
+        raise RuntimeError('{} changed too quickly to be read'.format(self.path))
+
+    def close(self):
+        if self._header is not None:
+            self._header.close()
+            self._header = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._writable = False
+
+
+class Publisher(object):
+    """
+    Keeps a `SharedSnapshot` up to date with a config. Created by `share`.
+
+    A publisher belongs to the process that created it: forked children
+    (the workers of a pre-fork server) get it detached, so they neither
+    publish nor watch the published config's file.
+    """
+
+    def __init__(self, config, path):
+        self.config = config
+        self.snapshot = SharedSnapshot(path)
+        self._lock = threading.Lock()  # Reloads and edits may publish from different threads
+        self.publish()
+        self._subscription = config.subscribe(None, self._changed)
+        _publishers.add(self)
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(self.__class__.__name__, self.config, self.snapshot.path)
+
+    def publish(self):
+        with self._lock:
+            data = self.config._data
+            data = thaw(data) if self.config.frozen else materialize(data)
+            return self.snapshot.publish(data, self.config.md5sum)
+
+    def _changed(self, key, old, new):
+        self.publish()
+
+    def close(self):
+        """
+        Stop publishing. The snapshot files are left for workers still using them.
+        """
+        _publishers.discard(self)
+        self.config.unsubscribe(self._subscription)
+        self.snapshot.close()
+
+    def _after_fork(self):
+        """
+        Called in a forked child, after the config itself was reset
+        """
+        self._lock = threading.Lock()  # May have been held mid-publish at the time of the fork
+        self.close()
+        self.config.stop_file_watch()  # Restarted by the config's own hook; the parent watches the file
+
+
+def share(config, path):
+    """
+    Publish config to a shared snapshot at path, and again every time
+    it reloads or is edited. Returns the `Publisher`.
+    """
+    return Publisher(config, path)
+
+
+class SharedConfig(Config):
+    """
+    Read-only config following a shared snapshot published with `share`.
+    `refresh` only unpickles the snapshot (into a copy owned by this
+    process) when its generation moved, and the file watcher only
+    compares generations.
+    """
+
+    def __init__(self, path, auto_reload=False, **kwargs):
+        super(SharedConfig, self).__init__(filename=path, auto_reload=auto_reload, **kwargs)
+        self.shared = SharedSnapshot(path)
+        self.shared_generation = 0
+
+    def refresh(self):
+        with self._writing():
+            try:
+                snapshot = self.shared.read() if self.config_file_changed else None
+                if snapshot is not None:
+                    generation, data, md5sum = snapshot
+                    self._install(data, md5sum, file_signature(self.filename))
+                    self.shared_generation = generation
+            except Exception as e:
+                self._count('reload_failures')
+                raise InvalidConfigFile('{} failed to load: {}'.format(self.filename, e))
+            self._count('reloads')
+        if self.auto_reload is True:
+            self.start_file_watch()
+
+    @property
+    def config_file_changed(self):
+        return self.shared.generation != self.shared_generation
+
+    def _check_writable(self):
+        raise ConfigEditFailed('{} is a read-only view of a shared snapshot'.format(self))
+
+    def save(self, skip_unchanged=None):
+        raise ConfigEditFailed('{} is a read-only view of a shared snapshot'.format(self))
+
+
+def from_shared(path, auto_reload=False, **kwargs):
+    """
+    Return a `SharedConfig` following the snapshot at path. Other
+    keyword arguments are passed on to `Config` (`frozen=True` keeps
+    each worker's copy compact).
+    """
+    config = SharedConfig(path, auto_reload=auto_reload, **kwargs)
+    config.refresh()
+    return config
+
+
+def _after_fork_in_child():
+    for publisher in list(_publishers):
+        try:
+            publisher._after_fork()
+        except Exception:
+            logger.exception('Failed to detach {} after fork'.format(publisher))
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)  # Runs after the hook of yact.config
@@ -0,0 +1,68 @@
+"""
+Incremental loading of multi-document (`---` separated) YAML streams.
+
+Generated streams mostly grow by appending documents. `DocumentStream`
+remembers a checkpoint: the byte offset where the last document starts,
+the documents before it and the hash of every byte before it. On the
+next load, if the file still starts with those bytes, only the text from
+the checkpoint on is parsed (the last document is parsed again, in case
+it was still being written). Anything else falls back to a full parse.
+
+Document boundaries are found by scanning for `---` at the start of a
+line, which YAML never allows inside a document's content. Streams with
+directives (`%YAML`, `%TAG`) or `...` document end markers are always
+parsed in full.
+"""
+import re
+import hashlib
+
+_DOCUMENT_START = re.compile(br'(?m)^---(?=[ \t\r\n]|$)')
+_UNSAFE_TAIL = re.compile(br'(?m)^(%|\.\.\.(?=[ \t\r\n]|$))')
+
+
+class DocumentStream(object):
+    """
+    Parse state of one multi-document file, loaded through
+    a backend providing `load_all`
+    """
+
+    def __init__(self, backend, unsafe=False):
+        self.backend = backend
+        self.unsafe = unsafe
+        self.reset()
+
+    def reset(self):
+        self.head = []  # Documents before the checkpoint
+        self.offset = 0  # Byte offset of the checkpoint
+        self.digest = None  # md5 of the bytes before the checkpoint
+        self.inode = None
+        self.incremental = False  # Whether the last load reused the checkpoint
+
+    def load(self, raw, inode=None):
+        """
+        Return `(documents, md5sum)` for the full contents raw
+        """
+        offset = self.offset
+        prefix = hashlib.md5(raw[:offset])
+        self.incremental = (self.digest is not None and inode == self.inode and len(raw) >= offset
+                            and prefix.hexdigest() == self.digest)
+        if self.incremental:
+            head = self.head
+        else:
+            head, offset, prefix = [], 0, hashlib.md5()
+        tail = raw[offset:]
+        documents = list(self.backend.load_all(tail, unsafe=self.unsafe))
+
+        total = prefix.copy()
+        total.update(tail)
+        starts = [m.start() for m in _DOCUMENT_START.finditer(tail)]
+        if documents and starts and not _UNSAFE_TAIL.search(tail):
+            last = starts[-1]  # Everything from here on is the last document
+            prefix.update(tail[:last])
+            self.head = head + documents[:-1]
+            self.offset = offset + last
+            self.digest = prefix.hexdigest()
+        elif not self.incremental:
+            self.head, self.offset, self.digest = [], 0, hashlib.md5().hexdigest()
+        self.inode = inode
+        return head + documents, total.hexdigest()
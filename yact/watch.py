@@ -0,0 +1,464 @@
+"""
+Cheap change detection for watched config files.
+
+`ChangeDetector` compares `os.stat` signatures first and only hashes
+file contents when the signature moved. On Linux, `Inotify` wraps the
+kernel's inotify API through ctypes so watchers can wake up as soon as
+a file changes instead of waiting for the next poll.
+
+`WatchScheduler` multiplexes every watched `Config` onto one thread
+holding a timer heap, so the thread count stays constant no matter
+how many files are watched.
+"""
+import os
+import errno
+import heapq
+import select
+import socket
+import struct
+import hashlib
+import logging
+import weakref
+import threading
+import ctypes
+import ctypes.util
+from time import time, monotonic, perf_counter
+from itertools import count
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Files modified this close to the moment their signature was taken
+# may change again without moving mtime on coarse-grained filesystems.
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+# Seconds before checking again a config whose writer lock was busy
+BUSY_RETRY = 0.1
+
+FileSignature = namedtuple('FileSignature', ['mtime_ns', 'size', 'inode'])
+
+
+def file_signature(filename):
+    """
+    Return the `FileSignature` of filename, or None if it cannot be stat'ed
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return FileSignature(st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def md5_bytes(raw):
+    return hashlib.md5(raw).hexdigest()
+
+
+class ChangeDetector(object):
+    """
+    Tiered file change detection: stat signature first,
+    content hash only when the signature differs but the
+    size does not (a different size is always a change).
+    """
+
+    def __init__(self):
+        self.signature = None
+        self._recorded_ns = 0
+
+    def record(self, signature):
+        """
+        Remember the signature matching the last known content
+        """
+        self.signature = signature
+        self._recorded_ns = int(time() * 1e9)
+
+    def changed(self, filename, md5sum):
+        signature = file_signature(filename)
+        if signature is None:
+            return False  # Missing (or mid-replace), nothing new to load yet
+        if signature == self.signature and signature.mtime_ns < self._recorded_ns - RACY_WINDOW_NS:
+            return False
+        if self.signature is not None and signature.size != self.signature.size:
+            return True  # Appended to or truncated, no need to hash
+        with open(filename, 'rb') as f:
+            changed = md5_bytes(f.read()) != md5sum
+        if not changed:
+            self.record(signature)  # Same content, trust the new signature from now on
+        return changed
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+_libc = _load_libc()
+inotify_available = _libc is not None
+
+
+class Inotify(object):
+    """
+    Minimal ctypes binding for Linux inotify.
+
+    Parent directories are watched rather than the files themselves
+    so atomic replacements (write to temp file, then rename) are seen.
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    _event = struct.Struct('iIII')
+
+    def __init__(self):
+        if not inotify_available:
+            raise OSError(errno.ENOSYS, 'inotify is not available on this platform')
+        self._fd = _libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._directories = {}  # wd -> directory
+
+    def fileno(self):
+        return self._fd
+
+    def add_watch(self, filename):
+        """
+        Watch the directory containing filename. Returns the watch descriptor.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        wd = _libc.inotify_add_watch(self._fd, directory.encode(), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), directory)
+        self._directories[wd] = directory
+        return wd
+
+    def remove_watch(self, wd):
+        if self._directories.pop(wd, None) is not None:
+            _libc.inotify_rm_watch(self._fd, wd)
+
+    def read(self):
+        """
+        Drain pending events, returning the set of changed paths
+        """
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            offset = 0
+            while offset < len(buf):
+                wd, mask, cookie, length = self._event.unpack_from(buf, offset)
+                offset += self._event.size
+                name = buf[offset:offset + length].rstrip(b'\0').decode(errors='surrogateescape')
+                offset += length
+                if wd in self._directories:
+                    changed.add(os.path.join(self._directories[wd], name))
+        return changed
+
+    def wait(self, timeout):
+        """
+        Block up to timeout seconds for events, returning the changed paths
+        """
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except (OSError, ValueError):
+            return set()
+        return self.read() if readable else set()
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._directories.clear()
+
+
+class _Watch(object):
+    __slots__ = ('key', 'config', 'path', 'interval', 'failures', 'due')
+
+    def __init__(self, config, interval):
+        self.key = id(config)
+        self.config = weakref.ref(config)
+        self.path = os.path.abspath(config.filename)
+        self.interval = interval
+        self.failures = 0
+        self.due = None
+
+
+class WatchScheduler(object):
+    """
+    Watch many `Config` objects from a single thread.
+
+    Each config keeps its own poll interval. A config that fails to
+    reload backs off exponentially (up to `max_backoff` seconds)
+    without delaying the others. inotify events, when available,
+    trigger an immediate check of the affected configs. A config whose
+    writer lock is held (by a `batch`, say) is skipped and checked
+    again `BUSY_RETRY` seconds later, so it cannot stall the others.
+    """
+
+    def __init__(self, max_backoff=300, use_inotify=True):
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._heap = []  # (due, seq, watch); stale entries are skipped on pop
+        self._seq = count()
+        self._watches = {}  # id(config) -> _Watch
+        self._paths = {}  # absolute path -> set of _Watch
+        self._directories = {}  # directory -> [wd, refcount]
+        self._thread = None
+        self._stopped = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        _schedulers.add(self)
+        self._notifier = None
+        if use_inotify and inotify_available:
+            try:
+                self._notifier = Inotify()
+            except OSError as e:
+                logger.debug('inotify unavailable, polling instead: {}'.format(e))
+
+    def __len__(self):
+        return len(self._watches)
+
+    def is_watching(self, config):
+        watch = self._watches.get(id(config))
+        return watch is not None and watch.config() is config
+
+    def _pop(self, key):
+        watch = self._watches.pop(key, None)
+        if watch is not None:
+            self._forget(watch)
+        return watch
+
+    def watch(self, config, interval=5):
+        """
+        Start watching config, checking it every `interval` seconds.
+        Returns False if config was already being watched.
+        """
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError('WatchScheduler has been shut down')
+            if self.is_watching(config):
+                return False
+            self._pop(id(config))  # Entry left behind by a collected config with a recycled id
+            watch = _Watch(config, interval)
+            self._watches[id(config)] = watch
+            self._paths.setdefault(watch.path, set()).add(watch)
+            self._add_directory(watch.path)
+            self._schedule(watch, interval)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='yact-watch-scheduler')
+                self._thread.daemon = True
+                self._thread.start()
+        self._wake()
+        return True
+
+    def unwatch(self, config):
+        """
+        Stop watching config. Returns False if it was not being watched.
+        """
+        with self._lock:
+            if not self.is_watching(config):
+                return False
+            self._pop(id(config))
+        return True
+
+    def shutdown(self, timeout=None):
+        """
+        Stop the scheduler thread and release its resources
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._watches.clear()
+            self._paths.clear()
+            self._heap = []
+            thread = self._thread
+        self._wake()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        if self._notifier is not None:
+            self._notifier.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _abandon(self):
+        """
+        Called in a forked child, where the scheduler thread does not
+        exist. Closes the child's copies of its descriptors without
+        waking the parent's thread. Watches are kept, so configs can
+        find their interval and watch again elsewhere.
+        """
+        self._lock = threading.Lock()
+        self._stopped = True
+        self._thread = None
+        self._heap = []
+        if self._notifier is not None:
+            self._notifier.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _add_directory(self, path):
+        if self._notifier is None:
+            return
+        directory = os.path.dirname(path)
+        if directory in self._directories:
+            self._directories[directory][1] += 1
+            return
+        try:
+            self._directories[directory] = [self._notifier.add_watch(path), 1]
+        except OSError as e:
+            logger.debug('Unable to watch {} with inotify: {}'.format(directory, e))
+
+    def _forget(self, watch):
+        watch.due = None  # Invalidates its heap entries
+        watchers = self._paths.get(watch.path)
+        if watchers is not None:
+            watchers.discard(watch)
+            if not watchers:
+                del self._paths[watch.path]
+        directory = os.path.dirname(watch.path)
+        entry = self._directories.get(directory)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._directories[directory]
+                self._notifier.remove_watch(entry[0])
+
+    def _schedule(self, watch, delay):
+        watch.due = monotonic() + delay
+        heapq.heappush(self._heap, (watch.due, next(self._seq), watch))
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass  # Already shut down, or the buffer is full and a wakeup is pending anyway
+
+    def _wait(self, timeout):
+        fds = [self._wake_r]
+        if self._notifier is not None:
+            fds.append(self._notifier)
+        try:
+            readable, _, _ = select.select(fds, [], [], timeout)
+        except (OSError, ValueError):
+            return set()
+        if self._wake_r in readable:
+            try:
+                while self._wake_r.recv(4096):
+                    pass
+            except OSError:
+                pass
+        if self._notifier is not None and self._notifier in readable:
+            return self._notifier.read()
+        return set()
+
+    def _check(self, watch):
+        config = watch.config()
+        if config is None:
+            with self._lock:
+                if self._watches.get(watch.key) is watch:
+                    self._pop(watch.key)
+            return
+        lock = config._lock
+        if not lock.acquire(blocking=False):  # A writer, or a batch, has it: come back rather than wait
+            delay = min(watch.interval, BUSY_RETRY)
+        else:
+            try:
+                metrics = getattr(config, 'metrics', None)
+                start = perf_counter()
+                changed = config.config_file_changed
+                if metrics is not None:
+                    metrics.observe('poll_seconds', perf_counter() - start)
+                if changed:
+                    config.refresh()  # Takes the lock again, which is reentrant
+                watch.failures = 0
+                delay = watch.interval
+            except Exception as e:
+                watch.failures += 1
+                delay = min(watch.interval * 2 ** watch.failures, self.max_backoff)
+                logger.warning('Failed to reload {} ({} consecutive failures, retrying in {}s): {}'.format(
+                    watch.path, watch.failures, delay, e))
+            finally:
+                lock.release()
+        with self._lock:
+            if watch.due is not None:  # Still watched
+                self._schedule(watch, delay)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+                now = monotonic()
+                ready = []
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, watch = heapq.heappop(self._heap)
+                    if watch.due == due:
+                        ready.append(watch)
+                timeout = self._heap[0][0] - now if self._heap else None
+            for watch in ready:
+                self._check(watch)
+            if ready:
+                continue
+            for path in self._wait(timeout):
+                with self._lock:
+                    watchers = list(self._paths.get(path, ()))
+                for watch in watchers:
+                    if watch.failures == 0:  # Failing files stay on their backoff schedule
+                        self._check(watch)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_schedulers = weakref.WeakSet()
+
+
+def get_scheduler():
+    """
+    Return the process-wide `WatchScheduler`, creating it on first use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler._stopped:
+            _scheduler = WatchScheduler()
+        return _scheduler
+
+
+def shutdown_scheduler(timeout=None):
+    """
+    Stop the process-wide `WatchScheduler`, if one is running
+    """
+    with _scheduler_lock:
+        scheduler = _scheduler
+    if scheduler is not None:
+        scheduler.shutdown(timeout)
+
+
+def _after_fork_in_child():
+    global _scheduler, _scheduler_lock
+    _scheduler_lock = threading.Lock()
+    _scheduler = None
+    for scheduler in list(_schedulers):
+        if not scheduler._stopped:
+            scheduler._abandon()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,139 @@
+"""
+Write-behind saving for configs edited at a high rate.
+
+With `Config(..., write_behind=True)`, `set` and `remove` only update
+the in-memory snapshot and mark the config dirty. A single background
+thread (`Flusher`) shared by every such config saves it once the edits
+pause for `write_behind` seconds, and never later than
+`write_behind_max_delay` seconds after the first unsaved edit. A burst
+of a thousand toggles therefore costs one save.
+
+`Config.flush()` saves pending edits immediately. Pending edits are
+flushed when the interpreter exits normally.
+"""
+import os
+import atexit
+import logging
+import threading
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 0.5
+
+
+class Flusher(object):
+    """
+    Background thread saving dirty configs when they are due
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending = {}  # config -> (first edit, last edit), both monotonic
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _due(self, config, first, last):
+        return min(last + config.write_behind, first + config.write_behind_max_delay)
+
+    def schedule(self, config):
+        """
+        Note an unsaved edit to config
+        """
+        now = monotonic()
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError('Flusher has been shut down')
+            first, _ = self._pending.get(config, (now, now))
+            self._pending[config] = (first, now)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='yact-write-behind')
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, config):
+        with self._condition:
+            self._pending.pop(config, None)
+
+    def flush_all(self):
+        """
+        Save every config with pending edits now
+        """
+        with self._condition:
+            configs = list(self._pending)
+        for config in configs:
+            try:
+                config.flush()
+            except Exception:
+                logger.exception('Failed to flush {}'.format(config))
+
+    def shutdown(self, timeout=None):
+        """
+        Flush pending edits and stop the thread
+        """
+        self.flush_all()
+        with self._condition:
+            self._stopped = True
+            thread = self._thread
+            self._condition.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    now = monotonic()
+                    ready = [c for c, (first, last) in self._pending.items() if self._due(c, first, last) <= now]
+                    if ready:
+                        break
+                    timeout = min((self._due(c, *times) - now for c, times in self._pending.items()), default=None)
+                    self._condition.wait(timeout)
+            for config in ready:
+                try:
+                    config.flush()
+                except Exception as e:
+                    logger.warning('Write-behind save of {} failed, retrying: {}'.format(config, e))
+                    self.schedule(config)
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def get_flusher():
+    """
+    Return the process-wide `Flusher`, creating it on first use
+    """
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or _flusher._stopped:
+            _flusher = Flusher()
+        return _flusher
+
+
+def flush_all():
+    """
+    Save every config with pending write-behind edits
+    """
+    with _flusher_lock:
+        flusher = _flusher
+    if flusher is not None:
+        flusher.flush_all()
+
+
+def _after_fork_in_child():
+    global _flusher, _flusher_lock
+    _flusher_lock = threading.Lock()  # The parent keeps saving its own pending edits
+    _flusher = None
+
+
+atexit.register(flush_all)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)